@@ -33,6 +33,22 @@ app.conf.update(
             "task": "posts.tasks.expire_post_recommended",
             "schedule": schedules.crontab(minute="*/1"),
         },
+        "flush_view_buffer": {
+            "task": "posts.tasks.flush_view_buffer",
+            "schedule": 10.0,  # 10초마다 실행되도록
+        },
+        "trim_home_timelines": {
+            "task": "posts.tasks.trim_home_timelines",
+            "schedule": schedules.crontab(minute="*/30"),
+        },
+        "refresh_recommended_users": {
+            "task": "relations.tasks.refresh_recommended_users",
+            "schedule": schedules.crontab(minute="0", hour="*/6"),
+        },
+        "reconcile_unread_counters": {
+            "task": "chats.tasks.reconcile_unread_counters",
+            "schedule": schedules.crontab(minute="*/10"),
+        },
     }
 )
 app.conf.task_routes = {
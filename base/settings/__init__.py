@@ -130,6 +130,10 @@ CACHES = {
         },
     }
 }
+# commons.lock의 get_redis가 프로세스마다 공유하는 커넥션 풀의 최대 커넥션 수
+REDIS_POOL_MAX_CONNECTIONS = int(getenv("REDIS_POOL_MAX_CONNECTIONS", 50))
+# 풀의 커넥션이 모두 사용중일 때 기다릴 시간(초)
+REDIS_POOL_TIMEOUT = int(getenv("REDIS_POOL_TIMEOUT", 5))
 
 CHANNEL_LAYERS = {
     "default": {
@@ -201,6 +205,53 @@ AWS_QUERYSTRING_AUTH = False
 DEFAULT_FILE_STORAGE = "storages.backends.s3boto3.S3Boto3Storage"
 
 
+# TIMELINE
+# 유저별 팔로잉 타임라인에 유지할 최대 게시글 수
+HOME_TIMELINE_MAX_ENTRIES = int(getenv("HOME_TIMELINE_MAX_ENTRIES", 800))
+# 팔로워가 이 수보다 많은 유저의 게시글은 팔로워들에게 기록하지 않고 조회시 합침
+HOME_TIMELINE_FAN_OUT_MAX_FOLLOWERS = int(
+    getenv("HOME_TIMELINE_FAN_OUT_MAX_FOLLOWERS", 5000)
+)
+# 팔로우시 타임라인에 채워넣을 대상 유저의 최근 게시글 수
+HOME_TIMELINE_BACKFILL_SIZE = int(getenv("HOME_TIMELINE_BACKFILL_SIZE", 50))
+# 조회 버퍼에서 한번에 꺼내 저장할 최대 조회 수
+VIEW_BUFFER_FLUSH_SIZE = int(getenv("VIEW_BUFFER_FLUSH_SIZE", 5000))
+
+# RECOMMEND
+# 인기 게시글 점수에 더해질 상호작용별 가중치, 취소되면 같은 값을 뺌
+POST_RECOMMEND_WEIGHTS = dict(
+    views=int(getenv("POST_RECOMMEND_VIEWS_WEIGHT", 1)),
+    favorites=int(getenv("POST_RECOMMEND_FAVORITES_WEIGHT", 5)),
+    bookmarks=int(getenv("POST_RECOMMEND_BOOKMARKS_WEIGHT", 2)),
+    reposts=int(getenv("POST_RECOMMEND_REPOSTS_WEIGHT", 10)),
+    replies=int(getenv("POST_RECOMMEND_REPLIES_WEIGHT", 3)),
+)
+# 인기 게시글 점수가 절반으로 줄어드는 시간, 최소 1시간
+POST_RECOMMEND_HALF_LIFE_HOURS = max(
+    int(getenv("POST_RECOMMEND_HALF_LIFE_HOURS", 6)), 1
+)
+# 비로그인 유저의 타임라인 페이지를 캐시할 시간(초)
+ANONYMOUS_PAGE_CACHE_TIMEOUT = int(getenv("ANONYMOUS_PAGE_CACHE_TIMEOUT", 30))
+# 직렬화된 게시글 조각(본문, 이미지, 멘션)을 캐시할 시간(초)
+POST_FRAGMENT_CACHE_TIMEOUT = int(getenv("POST_FRAGMENT_CACHE_TIMEOUT", 600))
+
+# RELATIONS
+# 유저별 팔로잉/팔로워 목록을 Redis에 유지할 시간(초), 팔로우/언팔로우시 연장됨
+SOCIAL_GRAPH_CACHE_TIMEOUT = int(getenv("SOCIAL_GRAPH_CACHE_TIMEOUT", 60 * 60 * 24))
+# 유저별로 미리 계산해둘 친구의 친구 추천 후보 수
+FOLLOW_RECOMMEND_SIZE = int(getenv("FOLLOW_RECOMMEND_SIZE", 100))
+# 미리 계산한 추천 후보를 Redis에 유지할 시간(초), 주기적으로 다시 계산됨
+FOLLOW_RECOMMEND_TIMEOUT = int(getenv("FOLLOW_RECOMMEND_TIMEOUT", 60 * 60 * 24))
+# kNN 추천 1순위 유저에게 더해질 점수 (함께 아는 팔로잉 1명이 1점)
+FOLLOW_RECOMMEND_KNN_WEIGHT = int(getenv("FOLLOW_RECOMMEND_KNN_WEIGHT", 2))
+
+# CHATS
+# 유저별 읽지 않은 메세지 수를 Redis에 유지할 시간(초), 만료되면 조회시 다시 계산됨
+CHAT_UNREAD_COUNTER_TIMEOUT = int(
+    getenv("CHAT_UNREAD_COUNTER_TIMEOUT", 60 * 60 * 24 * 7)
+)
+
+
 # THIRD PARTY
 KAKAO_CLIENT_KEY = getenv("KAKAO_CLIENT_KEY")
 KAKAO_SECRET_KEY = getenv("KAKAO_SECRET_KEY")
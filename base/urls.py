@@ -25,4 +25,5 @@ urlpatterns = [
     path("", include("relations.urls")),
     path("", include("notifications.urls")),
     path("", include("chats.urls")),
+    path("_/", include("commons.urls")),
 ]
@@ -0,0 +1,94 @@
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+from uuid import uuid4
+
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.management.base import BaseCommand, CommandError
+
+from users.consumers import UserConsumer
+from ...models import MessageGroup, Message
+from ...services import MessageService, UnreadCounter
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure send-to-websocket latency of the sync and deferred message paths. "
+        "Probe messages are really published to every attendant's websocket, "
+        "so run it against a dedicated group."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--group", type=int, required=True)
+        parser.add_argument("--user", type=int, required=True)
+        parser.add_argument("--count", type=int, default=20)
+        parser.add_argument("--timeout", type=float, default=10)
+
+    def handle(self, *args, group, user, count=20, timeout=10.0, **options):
+        if count < 1:
+            raise CommandError("--count must be at least 1")
+        if timeout <= 0:
+            raise CommandError("--timeout must be positive")
+        layer = get_channel_layer()
+        if not layer:
+            raise CommandError("channel layer is not configured")
+        message_group = MessageGroup.objects.filter(pk=group).first()
+        if not message_group:
+            raise CommandError(f"message group {group} does not exist")
+        sender = message_group.attendants.filter(pk=user).first()
+        if not sender:
+            raise CommandError(f"user {user} is not in message group {group}")
+
+        channel = async_to_sync(layer.new_channel)()
+        group_name = UserConsumer.get_group_name(sender.pk)
+        async_to_sync(layer.group_add)(group_name, channel)
+        service = MessageService(message_group)
+        identifiers: list[str] = []
+        try:
+            for deferred in (False, True):
+                latencies: list[float] = []
+                for _ in range(count):
+                    identifier = f"latency-{uuid4()}"
+                    identifiers.append(identifier)
+                    start = perf_counter()
+                    service.send_message(sender, "latency probe", identifier, deferred)
+                    latencies.append(
+                        self.wait_for(layer, channel, identifier, timeout) - start
+                    )
+                self.report("deferred" if deferred else "sync", latencies)
+        finally:
+            async_to_sync(layer.group_discard)(group_name, channel)
+            # 측정용 메세지를 지우고 최근 메세지와 읽지 않은 수를 다시 맞춤
+            Message.objects.filter(identifier__in=identifiers).delete()
+            MessageGroup.refresh_latest_message(message_group.pk)
+            UnreadCounter.load(
+                list(message_group.attendants.values_list("pk", flat=True))
+            )
+
+    @staticmethod
+    def wait_for(layer, channel: str, identifier: str, timeout: float) -> float:
+        # receive는 메세지가 올 때까지 막히므로 남은 시간만큼만 기다림
+        deadline = perf_counter() + timeout
+        while (remaining := deadline - perf_counter()) > 0:
+            try:
+                event = async_to_sync(asyncio.wait_for)(
+                    layer.receive(channel), remaining
+                )
+            except asyncio.TimeoutError:
+                break
+            message = event.get("data", {}).get("message", {})
+            if isinstance(message, dict) and message.get("identifier") == identifier:
+                return perf_counter()
+        raise CommandError(f"message {identifier} was not delivered in {timeout}s")
+
+    def report(self, name: str, latencies: list[float]):
+        ms = sorted(latency * 1000 for latency in latencies)
+        if len(ms) > 1:
+            cuts = quantiles(ms, n=100)
+            p50, p95 = cuts[49], cuts[94]
+        else:
+            p50 = p95 = ms[0]
+        self.stdout.write(
+            f"{name}: count={len(ms)} p50={p50:.1f}ms p95={p95:.1f}ms max={ms[-1]:.1f}ms"
+        )
@@ -0,0 +1,61 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:43
+
+from django.db import migrations, models
+
+
+def checks_to_read_cursor(apps, schema_editor):
+    # 다른 참여자의 메세지 중 확인한 가장 큰 id를 읽음 커서로 사용
+    # 내 메세지는 보낼 때 확인 처리되었으므로 제외
+    MessageAttendant = apps.get_model("chats", "MessageAttendant")
+    MessageCheck = apps.get_model("chats", "MessageCheck")
+    MessageAttendant.objects.update(
+        read_cursor=models.functions.Coalesce(
+            models.Subquery(
+                MessageCheck.objects.filter(
+                    user=models.OuterRef("user"),
+                    message__group=models.OuterRef("group"),
+                )
+                .exclude(message__attendant=models.OuterRef("pk"))
+                .order_by("-message")
+                .values("message")[:1]
+            ),
+            models.Value(0),
+        )
+    )
+
+
+def read_cursor_to_checks(apps, schema_editor):
+    MessageAttendant = apps.get_model("chats", "MessageAttendant")
+    Message = apps.get_model("chats", "Message")
+    MessageCheck = apps.get_model("chats", "MessageCheck")
+    for attendant in MessageAttendant.objects.iterator(chunk_size=1000):
+        messages = Message.objects.filter(group_id=attendant.group_id).filter(
+            models.Q(pk__lte=attendant.read_cursor)
+            | models.Q(attendant_id=attendant.pk)
+        )
+        MessageCheck.objects.bulk_create(
+            [
+                MessageCheck(user_id=attendant.user_id, message_id=message_id)
+                for message_id in messages.values_list("pk", flat=True)
+            ],
+            batch_size=1000,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0004_messagegroup_title'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messageattendant',
+            name='read_cursor',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(checks_to_read_cursor, read_cursor_to_checks),
+        migrations.DeleteModel(
+            name='MessageCheck',
+        ),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:46
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_latest_message(apps, schema_editor):
+    MessageGroup = apps.get_model("chats", "MessageGroup")
+    Message = apps.get_model("chats", "Message")
+
+    def get_latest(field: str):
+        return models.Subquery(
+            Message.objects.filter(group=models.OuterRef("pk"))
+            .order_by("-pk")
+            .values(field)[:1]
+        )
+
+    MessageGroup.objects.update(
+        latest_message_id=get_latest("pk"),
+        latest_message=models.functions.Coalesce(
+            get_latest("message"), models.Value("")
+        ),
+        latest_message_user_id=get_latest("attendant__user"),
+        latest_message_created_at=get_latest("created_at"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0005_messageattendant_read_cursor'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagegroup',
+            name='latest_message',
+            field=models.TextField(default=''),
+        ),
+        migrations.AddField(
+            model_name='messagegroup',
+            name='latest_message_created_at',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AddField(
+            model_name='messagegroup',
+            name='latest_message_id',
+            field=models.BigIntegerField(null=True),
+        ),
+        migrations.AddField(
+            model_name='messagegroup',
+            name='latest_message_user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='messagegroup',
+            index=models.Index(fields=['latest_message_created_at'], name='chats_messa_latest__6383dd_idx'),
+        ),
+        migrations.RunPython(backfill_latest_message, migrations.RunPython.noop),
+    ]
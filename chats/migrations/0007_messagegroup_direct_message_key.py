@@ -0,0 +1,59 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:51
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_direct_message_key(apps, schema_editor):
+    # 두 명이 남아있는 1:1 그룹에 키를 채움, 같은 두 유저의 그룹이 여럿이면 가장 최근 그룹만
+    MessageGroup = apps.get_model("chats", "MessageGroup")
+    MessageAttendant = apps.get_model("chats", "MessageAttendant")
+    rows = (
+        MessageAttendant.objects.filter(group__is_direct_message=True)
+        .values("group")
+        .annotate(
+            count=models.Count("pk"),
+            low_user=models.Min("user"),
+            high_user=models.Max("user"),
+        )
+        .filter(count=2)
+        .order_by("-group")
+    )
+    keyed: dict[tuple[int, int], int] = {}
+    for row in rows.iterator(chunk_size=1000):
+        keyed.setdefault((row["low_user"], row["high_user"]), row["group"])
+    MessageGroup.objects.bulk_update(
+        [
+            MessageGroup(pk=group_id, low_user_id=low_user, high_user_id=high_user)
+            for (low_user, high_user), group_id in keyed.items()
+        ],
+        ["low_user", "high_user"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('chats', '0006_messagegroup_latest_message'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='messagegroup',
+            name='high_user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='messagegroup',
+            name='low_user',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.RunPython(backfill_direct_message_key, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='messagegroup',
+            constraint=models.UniqueConstraint(condition=models.Q(('is_direct_message', True)), fields=('low_user', 'high_user'), name='unique_direct_message'),
+        ),
+    ]
@@ -7,15 +7,42 @@ from users.models import User
 
 # Create your models here.
 class MessageGroup(models.Model):
+    class Meta:
+        indexes = [models.Index(fields=["latest_message_created_at"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["low_user", "high_user"],
+                condition=models.Q(is_direct_message=True),
+                name="unique_direct_message",
+            )
+        ]
+
     is_direct_message = models.BooleanField(default=True)
+    # 1:1 메세지 그룹의 두 참여자를 id 순서로 정렬해 저장, 같은 두 유저의 그룹은 하나만 존재
+    # 한쪽이 나가면 비워져 새 그룹을 만들 수 있음
+    low_user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    high_user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
     title = models.CharField(max_length=255, default="")
     created_at = models.DateTimeField(auto_now_add=True)
+    # 마지막 메세지의 스냅샷, create_mssage에서 기록되어 목록 조회시 메세지를 정렬하지 않음
+    latest_message_id = models.BigIntegerField(null=True)
+    latest_message = models.TextField(default="")
+    latest_message_user = models.ForeignKey(
+        User, on_delete=models.SET_NULL, null=True, related_name="+"
+    )
+    latest_message_created_at = models.DateTimeField(null=True)
     attendants: "models.ManyToManyField[User,Self]" = models.ManyToManyField(
         User, through="MessageAttendant", related_name="message_groups"
     )
     messages: "models.Manager[Message]"
 
     unreaded_messages = make_property_field(0)
+    # 요청유저의 읽지 않은 메세지 수(unreaded_messages)가 UnreadCounter로 채워졌는지 여부
+    unreaded_loaded = make_property_field(False)
 
     @classmethod
     def concrete_queryset(cls, user: AbstractBaseUser | None = None):
@@ -24,66 +51,51 @@ class MessageGroup(models.Model):
         return cls.objects.prefetch_related(
             models.Prefetch("attendants", User.concrete_queryset(user))
         ).annotate(
-            latest_message=cls.get_latest_message(),
-            latest_message_user=cls.get_latest_message_user(),
-            latest_message_nickname=cls.get_latest_message_nickname(),
-            latest_message_created_at=cls.get_latest_message_created_at(),
-            unreaded_messages=models.Count(
-                Message.objects.annotate(
-                    has_checked=Message.get_has_checked(user),
-                )
-                .filter(
-                    has_checked=False,
-                    group=models.OuterRef("pk"),
-                )
-                .values("group")
-                .order_by("group")
-                .annotate(count=models.Count("group"))
-                .values("count")
-            ),
+            latest_message_nickname=models.F("latest_message_user__nickname"),
         )
 
-    @classmethod
-    def get_latest_message(cls):
-        return models.Subquery(
-            Message.objects.filter(group=models.OuterRef("pk"))
-            .order_by("-created_at")
-            .values(
-                "message",
-            )[:1]
-        )
-
-    @classmethod
-    def get_latest_message_user(cls):
-        return models.Subquery(
-            Message.objects.filter(group=models.OuterRef("pk"))
-            .annotate(user=models.F("attendant__user"))
-            .order_by("-created_at")
-            .values(
-                "user",
-            )[:1]
-        )
+    @staticmethod
+    def get_direct_message_key(*user_ids: int):
+        # (low_user_id, high_user_id), 두 명이 아니면 None
+        if len(set(user_ids)) != 2:
+            return None
+        low_user_id, high_user_id = sorted(set(user_ids))
+        return dict(low_user_id=low_user_id, high_user_id=high_user_id)
 
     @classmethod
-    def get_latest_message_created_at(cls):
-        return models.Subquery(
-            Message.objects.filter(group=models.OuterRef("pk"))
-            .annotate(user=models.F("attendant__user"))
-            .order_by("-created_at")
-            .values(
-                "created_at",
-            )[:1]
+    def set_latest_message(cls, message: "Message", user_id: int):
+        # 더 최근 메세지가 먼저 기록되었으면 덮어쓰지 않음
+        return (
+            cls.objects.filter(pk=message.group_id)
+            .filter(
+                models.Q(latest_message_id__isnull=True)
+                | models.Q(latest_message_id__lt=message.pk)
+            )
+            .update(
+                latest_message_id=message.pk,
+                latest_message=message.message,
+                latest_message_user_id=user_id,
+                latest_message_created_at=message.created_at,
+            )
         )
 
     @classmethod
-    def get_latest_message_nickname(cls):
-        return models.Subquery(
-            Message.objects.filter(group=models.OuterRef("pk"))
-            .annotate(nickname=models.F("attendant__user__nickname"))
-            .order_by("-created_at")
-            .values(
-                "nickname",
-            )[:1]
+    def refresh_latest_message(cls, *group_ids: int):
+        # 메세지가 지워졌을 때 남은 메세지로 스냅샷을 다시 계산
+        def get_latest(field: str):
+            return models.Subquery(
+                Message.objects.filter(group=models.OuterRef("pk"))
+                .order_by("-pk")
+                .values(field)[:1]
+            )
+
+        return cls.objects.filter(pk__in=group_ids).update(
+            latest_message_id=get_latest("pk"),
+            latest_message=models.functions.Coalesce(
+                get_latest("message"), models.Value("")
+            ),
+            latest_message_user_id=get_latest("attendant__user"),
+            latest_message_created_at=get_latest("created_at"),
         )
 
 
@@ -100,8 +112,19 @@ class MessageAttendant(models.Model):
     user = models.ForeignKey(
         User, on_delete=models.CASCADE, related_name="message_attendants"
     )
+    # 마지막으로 읽은 메세지의 id, 이보다 큰 id의 다른 참여자 메세지는 읽지 않은 메세지
+    read_cursor = models.BigIntegerField(default=0)
     messages: models.Manager["Message"]
 
+    @classmethod
+    def get_read_cursor(cls, user: AbstractBaseUser, group: models.Expression):
+        return models.functions.Coalesce(
+            models.Subquery(
+                cls.objects.filter(group=group, user=user).values("read_cursor")[:1]
+            ),
+            models.Value(0),
+        )
+
 
 class Message(models.Model):
     class Meta:
@@ -123,27 +146,17 @@ class Message(models.Model):
     nickname = make_property_field("")
     has_checked = make_property_field(False)
 
-    checks: "models.Manager[MessageCheck]"
-
     @classmethod
     def get_has_checked(cls, user: AbstractBaseUser | None = None):
+        # 내가 보낸 메세지이거나 읽음 커서 이전의 메세지
         if user and not user.is_authenticated:
             user = None
         if not user:
             return models.Value(False)
-        return models.functions.Coalesce(
-            models.Exists(
-                MessageCheck.objects.filter(user=user, message=models.OuterRef("pk"))
+        return models.ExpressionWrapper(
+            models.Q(attendant__user=user)
+            | models.Q(
+                pk__lte=MessageAttendant.get_read_cursor(user, models.OuterRef("group"))
             ),
-            models.Value(False),
+            output_field=models.BooleanField(),
         )
-
-
-class MessageCheck(models.Model):
-    created_at = models.DateTimeField(auto_now_add=True)
-    user = models.ForeignKey(
-        User, on_delete=models.CASCADE, related_name="checked_messages"
-    )
-    message = models.ForeignKey(
-        Message, on_delete=models.CASCADE, related_name="checks"
-    )
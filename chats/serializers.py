@@ -1,11 +1,23 @@
 from commons.serializers import BaseModelSerializer, serializers
 from users.serializers import UserSerializer
-from .models import MessageGroup, Message, User
+from .models import MessageGroup, Message, User, models
+
+
+class MessageGroupListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        from .services import UnreadCounter
+
+        groups = data.all() if isinstance(data, models.manager.BaseManager) else data
+        # 페이지의 그룹들의 읽지 않은 메세지 수를 한번에 채워넣음
+        request = self.context.get("request", None)
+        groups = UnreadCounter.hydrate(getattr(request, "user", None), groups)
+        return super().to_representation(groups)
 
 
 class MessageGroupSerializer(BaseModelSerializer[MessageGroup]):
     class Meta:
         model = MessageGroup
+        list_serializer_class = MessageGroupListSerializer
         fields = (
             "id",
             "is_direct_message",
@@ -22,10 +34,20 @@ class MessageGroupSerializer(BaseModelSerializer[MessageGroup]):
     attendants = UserSerializer(many=True)
     latest_message = serializers.CharField(required=False)
     latest_message_nickname = serializers.CharField(required=False)
-    latest_message_user = serializers.IntegerField(required=False)
+    latest_message_user = serializers.IntegerField(
+        source="latest_message_user_id", required=False
+    )
     latest_message_created_at = serializers.DateTimeField(required=False)
     unreaded_messages = serializers.IntegerField(required=False)
 
+    def to_representation(self, instance: MessageGroup):
+        if not instance.unreaded_loaded:
+            from .services import UnreadCounter
+
+            request = self.context.get("request", None)
+            UnreadCounter.hydrate(getattr(request, "user", None), [instance])
+        return super().to_representation(instance)
+
 
 class MessageSerializer(BaseModelSerializer[Message]):
     class Meta:
@@ -1,11 +1,16 @@
+from typing import Iterable
 from uuid import uuid4
+from django.conf import settings
 from django.contrib.auth.models import AbstractBaseUser
-from django.db import transaction, models
+from django.db import IntegrityError, transaction, models
 from rest_framework import exceptions
 
-from commons.lock import with_lock
+from commons.lock import get_redis
 
-from .models import User, MessageGroup, MessageAttendant, Message, MessageCheck, models
+from users.consumers import UserConsumer
+
+from .models import User, MessageGroup, MessageAttendant, Message, models
+from .serializers import MessageSerializer
 from .tasks import (
     send_message_by_ws_to_group,
     send_group_state_changed_to_users,
@@ -35,21 +40,26 @@ class MessageService:
         return True
 
     @classmethod
-    @transaction.atomic
     def get_or_create(
         cls, me: User, *users: User, is_direct_message: bool = True, title: str = ""
     ):
-        pk_flattened = map(lambda u: u.pk, [me, *users])
-        key = "message-create=" + ":".join(sorted(map(str, pk_flattened)))
-        with with_lock(key):
+        # 동시에 같은 1:1 그룹을 만들면 unique_direct_message 제약에 맡기고 먼저 만들어진 그룹을 사용
+        if service := cls.get_or_false(
+            me, *users, is_direct_message=is_direct_message, title=title
+        ):
+            return service
+        cls.is_valid_to_create(me, *users, raise_exception=True)
+        try:
+            with transaction.atomic():
+                return cls.create(
+                    me, *users, is_direct_message=is_direct_message, title=title
+                )
+        except IntegrityError:
             if service := cls.get_or_false(
                 me, *users, is_direct_message=is_direct_message, title=title
             ):
                 return service
-            cls.is_valid_to_create(me, *users, raise_exception=True)
-            return cls.create(
-                me, *users, is_direct_message=is_direct_message, title=title
-            )
+            raise
 
     @classmethod
     def get_or_false(
@@ -63,29 +73,20 @@ class MessageService:
 
     @classmethod
     def create(cls, *users: User, is_direct_message: bool = True, title: str = ""):
+        key = MessageGroup.get_direct_message_key(*(user.pk for user in users))
         group = MessageGroup.objects.create(
-            is_direct_message=is_direct_message, title=title
+            is_direct_message=is_direct_message,
+            title=title,
+            **(key if is_direct_message and key else {}),
         )
         group.attendants.add(*users)
         return cls(group)
 
     @classmethod
     def get_direct_message_group(cls, *users: User):
-        group_values = (
-            MessageAttendant.objects.filter(
-                user__in=users, group__is_direct_message=True
-            )
-            .values("group")
-            .order_by("group")
-            .annotate(group_count=models.Count("pk"))
-            .values("group_count", "group")
-            .filter(group_count=2)
-        )
-        if 1 < len(group_values):
-            raise Exception("그룹수가 많은데")
-        if group_value := group_values.first():
-            return MessageGroup.objects.get(pk=group_value.get("group"))
-        return None
+        if not (key := MessageGroup.get_direct_message_key(*(u.pk for u in users))):
+            return None
+        return MessageGroup.objects.filter(is_direct_message=True, **key).first()
 
     @classmethod
     def get_message_groups(cls, user: User):
@@ -103,10 +104,46 @@ class MessageService:
             detail=dict(user=["User not in message group"])
         )
 
-    def send_message(self, user: User, message: str, identifier: str | None = None):
+    def send_message(
+        self,
+        user: User,
+        message: str,
+        identifier: str | None = None,
+        deferred: bool = False,
+    ):
+        """
+        요청 안에서 메세지를 저장하고 커밋되면 바로 채널 레이어로 보냄
+        읽지 않은 수는 보내기 전에 늘려서, 받은 유저의 읽음 처리가 증가보다 먼저 실행되지 않음
+        deferred면 이전처럼 저장부터 create_mssage 태스크에서 처리
+        """
         if identifier == None:
             identifier = str(uuid4())
-        create_mssage.delay(self.group.pk, user.pk, message, identifier)
+        if deferred:
+            create_mssage.delay(self.group.pk, user.pk, message, identifier)
+            return None
+        attendant = self.get_attendant(user=user)
+        instance = attendant.messages.create(
+            group=self.group, message=message, identifier=identifier
+        )
+        MessageGroup.set_latest_message(instance, user.pk)
+        instance.user = user.pk
+        instance.nickname = user.nickname
+        data = MessageSerializer(instance).data
+        user_ids = list(self.group.attendants.values_list("pk", flat=True))
+
+        def on_commit():
+            UnreadCounter.increase(
+                self.group.pk, (pk for pk in user_ids if pk != user.pk)
+            )
+            self.publish(user_ids, data)
+
+        transaction.on_commit(on_commit)
+        return instance
+
+    @classmethod
+    def publish(cls, user_ids: Iterable[int], data: dict):
+        for user_id in user_ids:
+            UserConsumer.send_message(user_id, data)
 
     def get_messages(self, user: User):
         return self.group.messages.annotate(
@@ -117,13 +154,18 @@ class MessageService:
 
     @classmethod
     def get_unreaded_message(cls, user: AbstractBaseUser):
-        return Message.objects.annotate(
-            user=models.F("attendant__user"),
-            nickname=models.F("attendant__user__nickname"),
-            has_checked=Message.get_has_checked(user),
-        ).filter(
-            has_checked=False,
-            group__attendants=user,
+        # 참여중인 그룹마다 읽음 커서보다 뒤에 다른 참여자가 보낸 메세지
+        return (
+            Message.objects.annotate(
+                user=models.F("attendant__user"),
+                nickname=models.F("attendant__user__nickname"),
+                has_checked=models.Value(False),
+            )
+            .filter(
+                group__message_attendants__user=user,
+                pk__gt=models.F("group__message_attendants__read_cursor"),
+            )
+            .exclude(attendant__user=user)
         )
 
     def check_message(self, user: AbstractBaseUser):
@@ -132,6 +174,15 @@ class MessageService:
     def exit_room(self, user: User):
         attendant = self.get_attendant(user=user)
         self.group.attendants.remove(user)
+        UnreadCounter.reset(user.pk, self.group.pk)
+        if self.group.is_direct_message:
+            # 두 유저가 새 1:1 그룹을 만들 수 있도록 비워둠
+            MessageGroup.objects.filter(pk=self.group.pk).update(
+                low_user=None, high_user=None
+            )
+        # 나간 유저의 메세지가 함께 지워지므로 마지막 메세지와 남은 유저들의 읽지 않은 수를 다시 계산
+        MessageGroup.refresh_latest_message(self.group.pk)
+        UnreadCounter.load(self.group.attendants.values_list("pk", flat=True))
         send_group_state_changed_to_users.delay(self.group.pk)
 
     def add_user(self, user: User, *add_users: User):
@@ -150,4 +201,149 @@ class MessageService:
                 )
             )
         self.group.attendants.add(*add_users)
+        # 새로 참여한 유저는 이전 메세지들을 읽지 않은 상태로 시작
+        UnreadCounter.load(u.pk for u in add_users)
         send_group_state_changed_to_users.delay(self.group.pk)
+
+
+class UnreadCounter:
+    """
+    유저별 그룹마다의 읽지 않은 메세지 수를 Redis hash(field=그룹 id, value=개수)로 유지
+    1. 처음 조회될 때 읽음 커서로 DB에서 계산해 채우고, 채워졌다는 표시로 loaded 필드를 함께 넣음
+    2. 메세지를 보내기 전에 다른 참여자들의 개수를 늘리고, check_messages에서 0으로 되돌림
+    3. 합계는 total 필드에 함께 유지되어 배지 조회는 HGET 한번
+    4. reconcile_unread_counters 태스크가 주기적으로 DB와 맞춤
+    """
+
+    prefix = "chat_unread"
+    loaded_field = "loaded"
+    total_field = "total"
+
+    # 채워진 hash만 늘림, 채워지지 않은 hash는 조회될 때 DB에서 계산됨
+    increase_script = """
+    for _, key in ipairs(KEYS) do
+        if redis.call("HEXISTS", key, "loaded") == 1 then
+            redis.call("HINCRBY", key, ARGV[1], 1)
+            redis.call("HINCRBY", key, "total", 1)
+        end
+    end
+    """
+    reset_script = """
+    local count = tonumber(redis.call("HGET", KEYS[1], ARGV[1]) or "0")
+    if count ~= 0 and redis.call("HEXISTS", KEYS[1], "loaded") == 1 then
+        redis.call("HDEL", KEYS[1], ARGV[1])
+        redis.call("HINCRBY", KEYS[1], "total", -count)
+    end
+    return count
+    """
+
+    @classmethod
+    def get_key(cls, user_id: int):
+        return f"{cls.prefix}:{user_id}"
+
+    @classmethod
+    def increase(cls, group_id: int, user_ids: Iterable[int]):
+        keys = [cls.get_key(user_id) for user_id in user_ids]
+        if not keys:
+            return
+        with get_redis() as client:
+            client.register_script(cls.increase_script)(keys=keys, args=[group_id])
+
+    @classmethod
+    def reset(cls, user_id: int, group_id: int):
+        with get_redis() as client:
+            client.register_script(cls.reset_script)(
+                keys=[cls.get_key(user_id)], args=[group_id]
+            )
+
+    @classmethod
+    def count(cls, user_ids: Iterable[int]) -> dict[int, dict[int, int]]:
+        # {유저 id: {그룹 id: 읽지 않은 메세지 수}}, 유저 묶음마다 쿼리 한번
+        user_ids = list(user_ids)
+        counts: dict[int, dict[int, int]] = {user_id: {} for user_id in user_ids}
+        rows = (
+            Message.objects.annotate(
+                reader=models.F("group__message_attendants__user"),
+                read_cursor=models.F("group__message_attendants__read_cursor"),
+            )
+            .filter(reader__in=user_ids, pk__gt=models.F("read_cursor"))
+            .exclude(attendant__user=models.F("reader"))
+            .values("reader", "group")
+            .order_by()
+            .annotate(count=models.Count("pk"))
+            .values_list("reader", "group", "count")
+        )
+        for user_id, group_id, count in rows:
+            counts[user_id][group_id] = count
+        return counts
+
+    @classmethod
+    def load(cls, user_ids: Iterable[int], ttls: dict[int, int] | None = None):
+        # DB에서 다시 계산해 덮어씀, ttls가 주어지면 남아있던 만료시간을 유지
+        counts = cls.count(user_ids)
+        with get_redis() as client:
+            pipe = client.pipeline()
+            for user_id, groups in counts.items():
+                key = cls.get_key(user_id)
+                pipe.delete(key)
+                pipe.hset(
+                    key,
+                    mapping={
+                        cls.loaded_field: 1,
+                        cls.total_field: sum(groups.values()),
+                        **groups,
+                    },
+                )
+                timeout = (ttls or {}).get(user_id, -1)
+                if timeout <= 0:
+                    timeout = settings.CHAT_UNREAD_COUNTER_TIMEOUT
+                pipe.expire(key, timeout)
+            pipe.execute()
+        return counts
+
+    @classmethod
+    def get(cls, user_id: int) -> dict[int, int]:
+        with get_redis() as client:
+            values: dict[bytes, bytes] = client.hgetall(cls.get_key(user_id))  # type:ignore
+        if cls.loaded_field.encode() not in values:
+            return cls.load([user_id])[user_id]
+        return {
+            int(field): int(value)
+            for field, value in values.items()
+            if field.isdigit() and int(value)
+        }
+
+    @classmethod
+    def get_total(cls, user_id: int) -> int:
+        with get_redis() as client:
+            pipe = client.pipeline()
+            pipe.hexists(cls.get_key(user_id), cls.loaded_field)
+            pipe.hget(cls.get_key(user_id), cls.total_field)
+            loaded, total = pipe.execute()
+        if not loaded:
+            return sum(cls.load([user_id])[user_id].values())
+        return int(total or 0)
+
+    @classmethod
+    def hydrate(cls, user: AbstractBaseUser | None, groups: Iterable[MessageGroup]):
+        groups = list(groups)
+        counts = cls.get(user.pk) if user and user.is_authenticated else {}
+        for group in groups:
+            group.unreaded_messages = counts.get(group.pk, 0)
+            group.unreaded_loaded = True
+        return groups
+
+    @classmethod
+    def reconcile(cls, batch_size: int = 500):
+        # 남아있는 hash들만 batch_size명씩 DB와 맞춤, 조회되지 않은 유저의 hash는 만료됨
+        with get_redis() as client:
+            keys = list(client.scan_iter(match=f"{cls.prefix}:*", count=batch_size))
+        user_ids = [int(key.decode().rpartition(":")[2]) for key in keys]
+        for start in range(0, len(user_ids), batch_size):
+            batch = user_ids[start : start + batch_size]
+            with get_redis() as client:
+                pipe = client.pipeline()
+                for user_id in batch:
+                    pipe.ttl(cls.get_key(user_id))
+                ttls = dict(zip(batch, pipe.execute()))
+            cls.load(batch, ttls)
@@ -4,7 +4,7 @@ from users.models import User
 from users.consumers import UserConsumer
 
 from .serializers import MessageSerializer
-from .models import MessageGroup, Message, MessageAttendant, MessageCheck, models
+from .models import MessageGroup, Message, MessageAttendant, models
 
 
 @shared_task()
@@ -18,23 +18,38 @@ def create_mssage(group_id: int, user_id: int, message: str, identifier: str):
     instance = attendant.messages.create(
         group_id=group_id, message=message, identifier=identifier
     )
-    instance.checks.create(user_id=user_id)
+    MessageGroup.set_latest_message(instance, user_id)
+    on_message_created_task(group_id, user_id)
     send_message_by_ws_to_group.delay(instance.pk)
 
 
+@shared_task()
+def on_message_created_task(group_id: int, user_id: int):
+    # 메세지 전송 이후의 부가 작업, 보낸 유저를 제외한 참여자들의 읽지 않은 수를 늘림
+    from .services import UnreadCounter
+
+    UnreadCounter.increase(
+        group_id,
+        MessageAttendant.objects.filter(group_id=group_id)
+        .exclude(user_id=user_id)
+        .values_list("user_id", flat=True),
+    )
+
+
 @shared_task()
 def check_messages(group_id: int, user_id: int):
-    from .services import MessageService
+    # 읽음 커서를 그룹의 마지막 메세지로 옮김, 커서는 뒤로 가지 않음
+    from .services import UnreadCounter
 
-    group = MessageGroup.objects.filter(pk=group_id).first()
-    user = User.objects.filter(pk=user_id).first()
-    if not group or not user:
+    UnreadCounter.reset(user_id, group_id)
+    latest = Message.objects.filter(group_id=group_id).aggregate(
+        latest=models.Max("pk")
+    )["latest"]
+    if not latest:
         return
-    service = MessageService(group)
-    messages = service.__class__.get_unreaded_message(user).filter(group=group)
-
-    message_checks = [MessageCheck(user=user, message=message) for message in messages]
-    MessageCheck.objects.bulk_create(message_checks)
+    MessageAttendant.objects.filter(
+        group_id=group_id, user_id=user_id, read_cursor__lt=latest
+    ).update(read_cursor=latest)
 
 
 @shared_task()
@@ -75,3 +90,10 @@ def delete_no_message_group(group_id):
     if group.messages.all().exists():
         return
     group.delete()
+
+
+@shared_task()
+def reconcile_unread_counters():
+    from .services import UnreadCounter
+
+    UnreadCounter.reconcile()
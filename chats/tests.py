@@ -6,7 +6,7 @@ from relations.service import FollowService
 
 from .models import MessageGroup, MessageAttendant, Message, User, models
 from .serializers import MessageGroupSerializer
-from .services import MessageService
+from .services import MessageService, UnreadCounter
 
 
 class TestMessages(TestCase):
@@ -43,7 +43,7 @@ class TestMessages(TestCase):
         print(dm)
 
         current_queries = connection.queries.__len__()
-        self.assertEqual(current_queries - last_queries, 2)
+        self.assertEqual(current_queries - last_queries, 1)
 
         groups = MessageService.get_message_groups(self.user)
         self.assertEqual(groups.count(), 3)
@@ -189,3 +189,186 @@ class TestMessage(TestCase):
         self.assertEqual(resp.json().get("unreaded_messages"), 0)
         resp = self.client.get(f"/message_groups/{s1.group.pk}/messages/")
         self.assertEqual(resp.status_code, 200)
+
+    def test_read_cursor(self):
+        from .tasks import check_messages
+
+        # 그룹 생성 시그널 없이 그룹과 메세지를 만듦
+        group = MessageGroup.objects.bulk_create([MessageGroup()])[0]
+        me, other = MessageAttendant.objects.bulk_create(
+            [
+                MessageAttendant(group=group, user=self.user),
+                MessageAttendant(group=group, user=self.user2),
+            ]
+        )
+        messages = Message.objects.bulk_create(
+            [
+                Message(group=group, attendant=attendant, message=str(i))
+                for i, attendant in enumerate([other, me, other])
+            ]
+        )
+
+        def get_unreaded(user: User):
+            return UnreadCounter.count([user.pk])[user.pk].get(group.pk, 0)
+
+        # 내가 보낸 메세지는 읽은 메세지
+        self.assertEqual(get_unreaded(self.user), 2)
+        self.assertEqual(get_unreaded(self.user2), 1)
+        checked = MessageService(group).get_messages(self.user).order_by("pk")
+        self.assertEqual([m.has_checked for m in checked], [False, True, False])
+
+        with self.assertNumQueries(2):
+            check_messages(group.pk, self.user.pk)
+        me.refresh_from_db()
+        self.assertEqual(me.read_cursor, messages[-1].pk)
+        self.assertEqual(get_unreaded(self.user), 0)
+        self.assertEqual(MessageService.get_unreaded_message(self.user).exists(), False)
+        self.assertEqual(MessageService.get_unreaded_message(self.user2).count(), 1)
+
+        # 마지막 메세지가 지워져도 커서는 뒤로 가지 않음
+        Message.objects.filter(pk=messages[-1].pk).delete()
+        check_messages(group.pk, self.user.pk)
+        me.refresh_from_db()
+        self.assertEqual(me.read_cursor, messages[-1].pk)
+
+    def test_latest_message(self):
+        from .tasks import create_mssage
+
+        group = MessageGroup.objects.bulk_create([MessageGroup()])[0]
+        MessageAttendant.objects.bulk_create(
+            [
+                MessageAttendant(group=group, user=self.user),
+                MessageAttendant(group=group, user=self.user2),
+            ]
+        )
+        create_mssage(group.pk, self.user.pk, "1", "a")
+        create_mssage(group.pk, self.user2.pk, "2", "b")
+        group.refresh_from_db()
+        self.assertEqual(group.latest_message, "2")
+        self.assertEqual(group.latest_message_user_id, self.user2.pk)
+
+        # 이전 메세지로 덮어쓰지 않음
+        first = group.messages.order_by("pk").first()
+        self.assertEqual(MessageGroup.set_latest_message(first, self.user.pk), 0)
+
+        groups = MessageService.get_message_groups(self.user)
+        data = MessageGroupSerializer(groups, many=True).data
+        self.assertEqual(data[0]["latest_message"], "2")
+        self.assertEqual(data[0]["latest_message_user"], self.user2.pk)
+        self.assertEqual(data[0]["latest_message_nickname"], self.user2.nickname)
+
+        group.messages.filter(attendant__user=self.user2).delete()
+        MessageGroup.refresh_latest_message(group.pk)
+        group.refresh_from_db()
+        self.assertEqual(group.latest_message, "1")
+        self.assertEqual(group.latest_message_id, first.pk)
+
+    def test_unread_counter(self):
+        from commons.lock import get_redis
+        from .tasks import check_messages, create_mssage
+
+        group = MessageGroup.objects.bulk_create([MessageGroup()])[0]
+        MessageAttendant.objects.bulk_create(
+            [
+                MessageAttendant(group=group, user=self.user),
+                MessageAttendant(group=group, user=self.user2),
+            ]
+        )
+        self.assertEqual(UnreadCounter.get(self.user.pk), {})
+        create_mssage(group.pk, self.user2.pk, "1", "a")
+        create_mssage(group.pk, self.user2.pk, "2", "b")
+        with self.assertNumQueries(0):
+            self.assertEqual(UnreadCounter.get_total(self.user.pk), 2)
+            self.assertEqual(UnreadCounter.get(self.user.pk), {group.pk: 2})
+        # 채워지지 않았던 user2는 조회할 때 DB에서 계산
+        self.assertEqual(UnreadCounter.get(self.user2.pk), {})
+
+        self.client.login(self.user)
+        resp = self.client.get("/message_groups/")
+        self.assertEqual(resp.json()["results"][0]["unreaded_messages"], 2)
+        resp = self.client.get(f"/message_groups/{group.pk}/")
+        self.assertEqual(resp.json()["unreaded_messages"], 2)
+
+        check_messages(group.pk, self.user.pk)
+        resp = self.client.get("/message_groups/unreaded_count/")
+        self.assertEqual(resp.json()["count"], 0)
+        resp = self.client.get("/message_groups/has_unreaded_messages/")
+        self.assertEqual(resp.json()["count"], 0)
+
+        # 어긋난 개수는 reconcile이 DB와 맞춤
+        key = UnreadCounter.get_key(self.user.pk)
+        with get_redis() as client:
+            client.hset(key, mapping={"total": 5, group.pk: 5})
+        UnreadCounter.reconcile()
+        self.assertEqual(UnreadCounter.get_total(self.user.pk), 0)
+        with get_redis() as client:
+            self.assertLess(0, client.ttl(key))
+
+    def test_direct_message_key(self):
+        from django.db import IntegrityError
+
+        key = MessageGroup.get_direct_message_key(self.user2.pk, self.user.pk)
+        self.assertEqual(
+            key, dict(low_user_id=self.user.pk, high_user_id=self.user2.pk)
+        )
+        self.assertEqual(MessageGroup.get_direct_message_key(self.user.pk), None)
+
+        group = MessageGroup.objects.bulk_create([MessageGroup(**key)])[0]
+        with self.assertNumQueries(1):
+            found = MessageService.get_direct_message_group(self.user2, self.user)
+        self.assertEqual(found, group)
+        self.assertEqual(MessageService.get_direct_message_group(self.user), None)
+
+        # 같은 두 유저의 1:1 그룹은 하나만, 그룹 메세지는 제약을 받지 않음
+        MessageGroup.objects.bulk_create([MessageGroup(is_direct_message=False, **key)])
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            MessageGroup.objects.bulk_create([MessageGroup(**key)])
+
+    def test_send_message_sync(self):
+        from users.consumers import UserConsumer
+
+        group = MessageGroup.objects.bulk_create([MessageGroup()])[0]
+        MessageAttendant.objects.bulk_create(
+            [
+                MessageAttendant(group=group, user=self.user),
+                MessageAttendant(group=group, user=self.user2),
+            ]
+        )
+        UnreadCounter.load([self.user.pk, self.user2.pk])
+        service = MessageService(group)
+        # 태스크를 거치지 않고 요청 안에서 바로 저장됨, 읽지 않은 수는 커밋 이후에 늘어남
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            message = service.send_message(self.user, "1", "a")
+            self.assertEqual(UnreadCounter.get(self.user2.pk), {})
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(message.identifier, "a")
+        group.refresh_from_db()
+        self.assertEqual(group.latest_message_id, message.pk)
+        self.assertEqual(UnreadCounter.get(self.user2.pk), {group.pk: 1})
+        self.assertEqual(UnreadCounter.get(self.user.pk), {})
+
+        # 웹소켓으로 받은 메세지도 같은 경로로 저장, 참여하지 않은 그룹은 무시
+        consumer = UserConsumer()
+        consumer.user = self.user2
+        with self.captureOnCommitCallbacks(execute=True):
+            consumer.send_chat_message(group.pk, "2", "b")
+            consumer.send_chat_message(group.pk + 1, "3", "c")
+            consumer.send_chat_message("x", "4", "d")
+        self.assertEqual(
+            list(group.messages.order_by("id").values_list("identifier", flat=True)),
+            ["a", "b"],
+        )
+        self.assertEqual(UnreadCounter.get(self.user.pk), {group.pk: 1})
+
+        # 메세지를 받자마자 읽음 처리해도 이미 늘어난 수를 되돌리므로 읽지 않은 수가 남지 않음
+        publish = MessageService.publish
+        try:
+            MessageService.publish = classmethod(
+                lambda cls, user_ids, data: service.check_message(self.user)
+            )
+            with self.captureOnCommitCallbacks(execute=True):
+                service.send_message(self.user2, "5", "e")
+        finally:
+            MessageService.publish = publish
+        self.assertEqual(UnreadCounter.get(self.user.pk), {})
+        self.assertEqual(UnreadCounter.get_total(self.user.pk), 0)
@@ -13,7 +13,7 @@ from .serializers import (
     UserSerializer,
     serializers,
 )
-from .services import MessageService
+from .services import MessageService, UnreadCounter
 
 
 class MessageGroupViewset(BaseViewset[MessageGroup, User]):
@@ -103,8 +103,13 @@ class MessageGroupViewset(BaseViewset[MessageGroup, User]):
 
     @action(methods=["GET"], detail=False, url_path="has_unreaded_messages")
     def get_has_unreaded_messages(self, *args, **kwargs):
-        unreaded = MessageService.get_unreaded_message(self.request.user)
-        return self.Response(dict(count=unreaded.count()))
+        # 배지용 합계와 그룹별 개수, Redis hash에서 바로 읽음
+        counts = UnreadCounter.get(self.request.user.pk)
+        return self.Response(dict(count=sum(counts.values()), groups=counts))
+
+    @action(methods=["GET"], detail=False, url_path="unreaded_count")
+    def get_unreaded_count(self, *args, **kwargs):
+        return self.Response(dict(count=UnreadCounter.get_total(self.request.user.pk)))
 
     @action(methods=["POST"], detail=True, url_path="check_as_readed")
     def post_check_messages(self, *args, **kwargs):
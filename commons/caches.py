@@ -1,7 +1,9 @@
 from collections import Counter, defaultdict
 from datetime import datetime
 import json
-from typing import Generic, TypeVar, TypedDict
+from typing import Generic, Iterable, TypeVar, TypedDict
+
+import redis
 
 from django.utils.timezone import localtime
 
@@ -9,6 +11,39 @@ from commons.lock import get_redis
 
 
 class LRUCache:
+    """
+    최근 max_size개의 값만 유지하는 Redis 리스트
+    1. add는 RPUSH와 LTRIM을 MULTI 파이프라인 한번으로 실행해 동시에 추가되어도 크기를 넘지 않음
+    2. counter는 Lua 스크립트로 서버에서 집계하여 리스트 전체를 받아오지 않음
+    3. add_many로 여러 키에 한번에 추가
+    """
+
+    # 값별 개수를 세어 많은 순서로, 같으면 먼저 추가된 순서로 반환
+    counter_script = """
+    local values = redis.call("LRANGE", KEYS[1], 0, -1)
+    local counts, firsts, uniques = {}, {}, {}
+    for index, value in ipairs(values) do
+        if counts[value] then
+            counts[value] = counts[value] + 1
+        else
+            counts[value] = 1
+            firsts[value] = index
+            table.insert(uniques, value)
+        end
+    end
+    table.sort(uniques, function(a, b)
+        if counts[a] ~= counts[b] then
+            return counts[a] > counts[b]
+        end
+        return firsts[a] < firsts[b]
+    end)
+    local limit = tonumber(ARGV[1])
+    if 0 < limit and limit < #uniques then
+        return {unpack(uniques, 1, limit)}
+    end
+    return uniques
+    """
+
     def __init__(self, key: str, max_size: int):
         self.client = get_redis()
         self.key = key
@@ -32,19 +67,33 @@ class LRUCache:
         return self.client.lpop(self.key, length)
 
     def add(self, *values: int):
-        new_length = len(values)
-        already = len(self.all())
-        exceed = already + new_length - self.max_size
-        if 0 < exceed:
-            self.lpop(exceed)
-        if self.max_size < new_length:
-            values = values[new_length - self.max_size : new_length]
-        self.client.rpush(self.key, *values)
-
-    def counter(self):
-        all = self.all()
-        counter = Counter(all)
-        return list(map(lambda x: x[0], sorted(counter.items(), key=lambda x: -x[1])))
+        self.add_many({self.key: values}, self.max_size, client=self.client)
+
+    @classmethod
+    def add_many(
+        cls,
+        values: dict[str, Iterable[int]],
+        max_size: int,
+        client: redis.Redis | None = None,
+    ):
+        # 키마다 RPUSH 후 뒤에서부터 max_size개만 남김, 모든 키를 하나의 트랜잭션으로 실행
+        if client == None:
+            with get_redis() as client:
+                return cls.add_many(values, max_size, client=client)
+        lists = {key: list(items) for key, items in values.items()}
+        if not (lists := {key: items for key, items in lists.items() if items}):
+            return
+        with client.pipeline(transaction=True) as pipe:
+            for key, items in lists.items():
+                pipe.rpush(key, *items)
+                pipe.ltrim(key, -max_size, -1)
+            pipe.execute()
+
+    def counter(self, limit: int | None = None) -> list[int]:
+        # EVALSHA로 실행, 서버에 스크립트가 없을 때만 본문을 보냄
+        counter = self.client.register_script(self.counter_script)
+        values = counter(keys=[self.key], args=[limit or 0])
+        return list(map(int, values))  # type:ignore
 
 
 T = TypeVar("T")
@@ -148,3 +197,132 @@ class TimeoutCache(Generic[T]):
             res[item["v"]] += item["w"]
         sorted_res = sorted(res.items(), key=lambda x: -x[1])
         return list(map(lambda x: x[0], sorted_res))
+
+
+class TrendingCache:
+    """
+    시간 단위 버킷(sorted set)에 ZINCRBY로 점수를 누적하는 인기 게시글 캐시
+    1. 조회시 최근 window_buckets개의 버킷을 오래될수록 작은 가중치로 ZUNIONSTORE하여 합침
+    2. 합쳐진 결과는 merged_timeout초 동안 재사용되어 상위 N개 조회는 ZREVRANGE 한번
+    3. 버킷은 TTL로 통째로 만료되므로 항목마다 삭제할 필요가 없음
+    TimeoutCache와 같은 add, counter, remove_out_dated를 제공
+    """
+
+    def __init__(
+        self,
+        key: str,
+        bucket_seconds: int = 60 * 60,
+        window_buckets: int = 24,
+        half_life_buckets: int = 6,
+        merged_timeout: int = 60,
+    ):
+        self.client = get_redis()
+        self.key = key
+        self.bucket_seconds = bucket_seconds
+        self.window_buckets = window_buckets
+        if half_life_buckets < 1:
+            raise ValueError("half_life_buckets must be at least 1")
+        self.decay = 0.5 ** (1 / half_life_buckets)
+        self.merged_timeout = merged_timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args, **kwargs):
+        self.client.close()
+
+    @property
+    def buckets_key(self):
+        return f"{self.key}:buckets"
+
+    @property
+    def merged_key(self):
+        return f"{self.key}:merged"
+
+    def bucket_of(self, dt: datetime):
+        return int(dt.timestamp() // self.bucket_seconds)
+
+    def bucket_key(self, bucket: int):
+        return f"{self.key}:{bucket}"
+
+    def buckets(self) -> list[int]:
+        # 오래된 버킷부터 반환
+        return list(map(int, self.client.zrange(self.buckets_key, 0, -1)))
+
+    def trunc(self):
+        self.client.delete(
+            *map(self.bucket_key, self.buckets()), self.buckets_key, self.merged_key
+        )
+
+    def add(self, *values: int, weights=1, created_at: datetime | None = None):
+        if not values:
+            return
+        if created_at == None:
+            created_at = localtime()
+        bucket = self.bucket_of(created_at)
+        bucket_key = self.bucket_key(bucket)
+        timeout = (self.window_buckets + 1) * self.bucket_seconds
+        with self.client.pipeline(transaction=False) as pipe:
+            for value, count in Counter(values).items():
+                pipe.zincrby(bucket_key, weights * count, value)
+            pipe.expire(bucket_key, timeout)
+            if weights < 0:
+                # 취소로 점수가 0 이하가 된 항목은 버킷에서 제거
+                pipe.zremrangebyscore(bucket_key, "-inf", 0)
+            pipe.zadd(self.buckets_key, {bucket: bucket})
+            pipe.expire(self.buckets_key, timeout)
+            pipe.execute()
+
+    def merge(self):
+        current = self.bucket_of(localtime())
+        weights = {
+            self.bucket_key(bucket): self.decay ** (current - bucket)
+            for bucket in self.buckets()
+            if current - self.window_buckets < bucket
+        }
+        with self.client.pipeline() as pipe:
+            pipe.delete(self.merged_key)
+            if weights:
+                pipe.zunionstore(self.merged_key, weights, aggregate="SUM")
+                pipe.expire(self.merged_key, self.merged_timeout)
+            pipe.execute()
+
+    def counter(self, limit: int | None = None) -> list[int]:
+        # 점수가 0보다 큰 항목들을 점수 내림차순으로 반환
+        if not self.client.exists(self.merged_key):
+            self.merge()
+        values = self.client.zrevrangebyscore(
+            self.merged_key,
+            "+inf",
+            "(0",
+            start=None if limit == None else 0,
+            num=limit,
+        )
+        return list(map(int, values))  # type:ignore
+
+    def all(self):
+        return self.counter()
+
+    def remove_out_dated(self, expire: datetime, min_items_count=100):
+        # expire 이전 버킷들을 오래된 순서로 지우되, 전체 항목 수가 min_items_count 아래로 내려가지 않도록
+        # 마지막 버킷은 점수가 낮은 항목부터 일부만 제거
+        expire_bucket = self.bucket_of(expire)
+        buckets = self.buckets()
+        with self.client.pipeline(transaction=False) as pipe:
+            for bucket in buckets:
+                pipe.zcard(self.bucket_key(bucket))
+            sizes = dict(zip(buckets, pipe.execute()))
+        removal_size = sum(sizes.values()) - min_items_count
+        for bucket in buckets:
+            if expire_bucket <= bucket or removal_size <= 0:
+                break
+            if sizes[bucket] <= removal_size:
+                self.client.delete(self.bucket_key(bucket))
+                self.client.zrem(self.buckets_key, bucket)
+            else:
+                self.client.zpopmin(self.bucket_key(bucket), removal_size)
+            removal_size -= sizes[bucket]
+        # TTL로 만료된 버킷들을 목록에서 정리
+        oldest = self.bucket_of(localtime()) - self.window_buckets
+        self.client.zremrangebyscore(self.buckets_key, "-inf", oldest)
+        self.client.delete(self.merged_key)
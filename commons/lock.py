@@ -1,6 +1,7 @@
 from functools import wraps
-import redis, os
-from typing import Generic, TypeVar, ParamSpec, Callable
+import redis, os, threading
+from time import perf_counter
+from typing import Generic, TypeVar, ParamSpec, Callable, TypedDict
 
 import redis.lock
 
@@ -8,8 +9,135 @@ T = TypeVar("T")
 P = ParamSpec("P")
 
 
+class PoolMetrics(TypedDict):
+    max_connections: int
+    created_connections: int
+    in_use_connections: int
+    available_connections: int
+    acquired_count: int
+    wait_seconds: float
+    max_wait_seconds: float
+
+
+class PoolMeter:
+    """
+    커넥션 풀의 커넥션 수와 커넥션을 얻기까지 기다린 시간을 기록
+    풀의 내부 구현에 의존하지 않도록 get_connection/release/make_connection에서 직접 셈
+    """
+
+    def __init__(self, max_connections: int):
+        self.max_connections = max_connections
+        self.lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        self.created_connections = 0
+        self.in_use_connections = 0
+        self.acquired_count = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def created(self):
+        with self.lock:
+            self.created_connections += 1
+
+    def acquired(self, waited: float):
+        with self.lock:
+            self.in_use_connections += 1
+            self.acquired_count += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def released(self):
+        with self.lock:
+            self.in_use_connections = max(self.in_use_connections - 1, 0)
+
+    def to_dict(self) -> PoolMetrics:
+        with self.lock:
+            return PoolMetrics(
+                max_connections=self.max_connections,
+                created_connections=self.created_connections,
+                in_use_connections=self.in_use_connections,
+                available_connections=max(
+                    self.created_connections - self.in_use_connections, 0
+                ),
+                acquired_count=self.acquired_count,
+                wait_seconds=self.wait_seconds,
+                max_wait_seconds=self.max_wait_seconds,
+            )
+
+
+class MeteredConnectionPool(redis.BlockingConnectionPool):
+    meter: PoolMeter
+
+    def reset(self):
+        # fork된 자식 프로세스에서 _checkpid가 reset을 호출하면 기록도 새로 시작
+        super().reset()
+        if not hasattr(self, "meter"):
+            self.meter = PoolMeter(self.max_connections)
+        self.meter.clear()
+
+    def make_connection(self):
+        connection = super().make_connection()
+        self.meter.created()
+        return connection
+
+    def get_connection(self, *args, **kwargs):
+        started = perf_counter()
+        connection = super().get_connection(*args, **kwargs)
+        self.meter.acquired(perf_counter() - started)
+        return connection
+
+    def release(self, connection):
+        pid = self.pid
+        super().release(connection)
+        if pid == self.pid == os.getpid():
+            self.meter.released()
+
+
+# 프로세스 단위로 공유하는 커넥션 풀, fork된 자식 프로세스(celery prefork 워커)는 새로 만듦
+_pool: MeteredConnectionPool | None = None
+_pool_lock = threading.Lock()
+
+
+def get_pool_options():
+    from django.conf import settings
+
+    return dict(
+        max_connections=settings.REDIS_POOL_MAX_CONNECTIONS,
+        timeout=settings.REDIS_POOL_TIMEOUT,
+    )
+
+
+def get_pool() -> MeteredConnectionPool:
+    global _pool
+    if _pool == None or _pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool == None or _pool.pid != os.getpid():
+                _pool = MeteredConnectionPool.from_url(
+                    os.getenv("CACHE_HOST"), **get_pool_options()
+                )
+    return _pool
+
+
+def reset_pools():
+    # 부모 프로세스의 소켓을 자식 프로세스가 이어서 쓰지 않도록 fork 직후 풀을 버림
+    global _pool
+    _pool = None
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_pools)
+
+
 def get_redis():
-    return redis.from_url(os.getenv("CACHE_HOST"))
+    # close()는 커넥션을 풀에 돌려줄 뿐이므로 기존처럼 with 문으로 사용
+    return redis.Redis(connection_pool=get_pool())
+
+
+def get_pool_metrics() -> PoolMetrics:
+    # 현재 프로세스의 풀 상태
+    return get_pool().meter.to_dict()
 
 
 def _with_lock(key: str | Callable[P, str], blocking_timeout: int | None = None):
@@ -21,8 +149,8 @@ def _with_lock(key: str | Callable[P, str], blocking_timeout: int | None = None)
         def wrapper(*args: P.args, **kwargs: P.kwargs):
 
             _key = key if isinstance(key, str) else key(*args, **kwargs)
-            with redis.from_url(os.getenv("CACHE_HOST")) as client:
-                with client.lock(name=_key, blocking_timeout=5):
+            with get_redis() as client:
+                with client.lock(name=_key, blocking_timeout=blocking_timeout):
                     return func(*args, **kwargs)
 
         return wrapper
@@ -37,7 +165,6 @@ class with_lock(Generic[P, T]):
         self, key: str | Callable[P, str], blocking_timeout: int | None = None
     ):
         self.blocking_timeout = 5 if blocking_timeout == None else blocking_timeout
-        self.blocking_timeout = blocking_timeout
         self.key = key
 
     def __call__(self, func: Callable[P, T]) -> Callable[P, T]:
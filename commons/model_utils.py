@@ -1,7 +1,7 @@
-from typing import TypeVar, Any
+from typing import TypeVar, Any, Self
 import uuid
 
-from django.db import models
+from django.db import models, transaction
 
 
 T = TypeVar("T")
@@ -22,3 +22,116 @@ def make_property_field(default_value: T) -> T:
         setattr(self, field_name, value)
 
     return property(fget=getter, fset=setter)  # type:ignore
+
+
+class CounterModel(models.Model):
+    """
+    소유 객체(게시글, 유저...)별 집계값을 저장하는 테이블의 공통 동작.
+    서브클래스는 소유 객체를 가리키는 primary key OneToOneField(related_name="counter")와
+    count_fields, get_count_subqueries를 정의한다.
+    """
+
+    # 소유 객체를 가리키는 필드 이름
+    owner_field: str
+    count_fields: tuple[str, ...] = ()
+    # 감소만 있는 소유 객체의 행을 새로 만들지 여부
+    create_on_decrease = True
+
+    class Meta:
+        abstract = True
+
+    @classmethod
+    def get_count(cls, field: str):
+        return models.functions.Coalesce(
+            models.F(f"counter__{field}"), models.Value(0)
+        )
+
+    @classmethod
+    def get_owner_model(cls) -> type[models.Model]:
+        return cls._meta.get_field(cls.owner_field).related_model  # type:ignore
+
+    @classmethod
+    def increase_many(cls, deltas_by_owner: dict[int, dict[str, int]]):
+        if not deltas_by_owner:
+            return
+        owner_id = f"{cls.owner_field}_id"
+        with transaction.atomic():
+            cls.objects.bulk_create(
+                [
+                    cls(**{owner_id: pk})
+                    for pk, deltas in deltas_by_owner.items()
+                    if cls.create_on_decrease
+                    or any(0 < delta for delta in deltas.values())
+                ],
+                ignore_conflicts=True,
+            )
+            for pk, deltas in deltas_by_owner.items():
+                updates = {
+                    field: models.F(field) + delta
+                    for field, delta in deltas.items()
+                    if delta
+                }
+                if updates:
+                    cls.objects.filter(**{owner_id: pk}).update(**updates)
+
+    @staticmethod
+    def count_of(qs: models.QuerySet, field: str):
+        # 소유 객체의 pk를 가리키는 field로 묶은 COUNT 서브쿼리
+        return models.functions.Coalesce(
+            models.Subquery(
+                qs.filter(**{field: models.OuterRef("pk")})
+                .order_by(field)
+                .values(field)
+                .annotate(count=models.Count("pk"))
+                .values("count")
+            ),
+            models.Value(0),
+        )
+
+    @classmethod
+    def get_count_subqueries(cls) -> dict[str, Any]:
+        raise NotImplementedError
+
+    @classmethod
+    def reconcile(cls, owners: models.QuerySet | None = None, batch_size=1000):
+        """
+        실제 하위 테이블의 COUNT와 카운터를 비교하여 어긋난 소유 객체의 카운터를 다시 기록한다.
+        수정된 소유 객체의 수를 반환
+        """
+        if owners is None:
+            owners = cls.get_owner_model().objects.all()
+        current = {
+            f"current_{field}": models.F(f"counter__{field}")
+            for field in cls.count_fields
+        }
+        rows = (
+            owners.order_by("pk")
+            .annotate(**cls.get_count_subqueries(), **current)
+            .values("pk", *cls.count_fields, *current.keys())
+        )
+        owner_id = f"{cls.owner_field}_id"
+        drifted: list[Self] = []
+        fixed = 0
+        for row in rows.iterator(chunk_size=batch_size):
+            if all(row[field] == row[f"current_{field}"] for field in cls.count_fields):
+                continue
+            drifted.append(
+                cls(**{owner_id: row["pk"]}, **{f: row[f] for f in cls.count_fields})
+            )
+            if batch_size <= len(drifted):
+                fixed += cls._write_counters(drifted)
+                drifted = []
+        fixed += cls._write_counters(drifted)
+        return fixed
+
+    @classmethod
+    def _write_counters(cls, counters: list[Self]):
+        if not counters:
+            return 0
+        cls.objects.bulk_create(
+            counters,
+            update_conflicts=True,
+            unique_fields=[cls.owner_field],
+            update_fields=list(cls.count_fields),
+        )
+        return len(counters)
@@ -44,5 +44,8 @@ class CommonModel(BaseModel, SoftDeleteModel):
         if replace:
             qs = replace
         return qs.prefetch_related(
-            models.Prefetch("user", User.concrete_queryset(user=kwargs.get("user")))
+            models.Prefetch(
+                "user",
+                User.concrete_queryset(user=kwargs.get("user"), projection="card"),
+            )
         ).all()
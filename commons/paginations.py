@@ -116,3 +116,80 @@ class TimelinePagination(BasePagination):
                 "next_offset": next_offset,
             }
         )
+
+
+class SessionPagination(TimelinePagination):
+    """
+    미리 순위가 매겨진 id 목록(view.session)을 위치로 잘라 해당 페이지의 객체만 조회
+    offset은 목록 안에서의 위치이며 응답 형식은 TimelinePagination과 같음
+    """
+
+    offset_field = "position"
+
+    def get_position(self, request: Request):
+        try:
+            return _positive_int(self.get_offset(request) or 0)
+        except ValueError:
+            return 0
+
+    def paginate_queryset(self, queryset, request, view=None):
+        session: list[Any] = getattr(view, "session", [])
+        position = self.get_position(request)
+        page_size = self.get_page_size(request)
+        self._offset_field = self.offset_field
+        if self.get_direction(request) == "__gt":
+            self._start, self._end = 0, min(position, page_size)
+        else:
+            self._start, self._end = position, position + page_size
+        self._has_next = self._end < len(session)
+        page = session[self._start : self._end]
+        instances = {instance.pk: instance for instance in queryset.filter(pk__in=page)}
+        return [instances[pk] for pk in page if pk in instances]
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "current_offset": self._start if data else None,
+                "offset_field": self._offset_field,
+                "next_offset": self._end if self._has_next else None,
+            }
+        )
+
+
+class EntryPagination(TimelinePagination):
+    """
+    view.get_entries(offset, direction, size)로 (id, offset 값) 목록을 먼저 페이지 단위로 구하고
+    해당 객체들만 조회해 offset 값을 채워넣음, offset과 응답 형식은 TimelinePagination과 같음
+    """
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self._offset = self.get_offset(request)
+        self._direction = self.get_direction(request)
+        self._offset_field = self.get_offset_field(request, view)
+        page_size = self.get_page_size(request)
+        entries: list[tuple[Any, Any]] = view.get_entries(  # type:ignore
+            self._offset, self._direction, page_size + 1
+        )
+        self._next_offset = entries[page_size][1] if page_size < len(entries) else None
+        entries = entries[:page_size]
+        instances = {
+            instance.pk: instance
+            for instance in queryset.filter(pk__in=[pk for pk, _ in entries])
+        }
+        page = []
+        for pk, value in entries:
+            if instance := instances.get(pk, None):
+                setattr(instance, self._offset_field, value)
+                page.append(instance)
+        return page
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "results": data,
+                "current_offset": self.get_response_current_offset(data),
+                "offset_field": self._offset_field,
+                "next_offset": self._next_offset,
+            }
+        )
@@ -54,3 +54,10 @@ class AdminOrReadOnly(BasePermission):
         if not request.user.is_staff:
             return False
         return True
+
+
+class StaffOnly(BasePermission):
+    def has_permission(self, request: Request[AbstractUser], view):
+        if isinstance(request.user, AnonymousUser):
+            raise exceptions.NotAuthenticated
+        return bool(request.user.is_staff)
@@ -7,6 +7,12 @@ import redis
 from django.test import TestCase
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.utils.timezone import localtime, timedelta
+
+from base.test import TestCase as APITestCase
+
+from .caches import LRUCache, TrendingCache
+from .lock import get_pool, get_pool_metrics, get_redis, reset_pools
 
 
 class TestCommon(TestCase):
@@ -42,6 +48,68 @@ class TestCommon(TestCase):
             something = client.get(key)
             self.assertEqual(something, None)
 
+    def test_redis_pool(self):
+        with get_redis() as client:
+            client.set("test/pool", 1)
+        with get_redis() as client:
+            self.assertIs(client.connection_pool, get_pool())
+            self.assertEqual(int(client.get("test/pool")), 1)  # type:ignore
+            client.delete("test/pool")
+
+        metrics = get_pool_metrics()
+        self.assertEqual(metrics["in_use_connections"], 0)
+        self.assertLessEqual(metrics["created_connections"], metrics["max_connections"])
+        self.assertGreaterEqual(metrics["acquired_count"], 3)
+
+        # fork된 자식 프로세스에서는 부모의 풀을 버리고 새로 만듦
+        pool = get_pool()
+        reset_pools()
+        self.assertIsNot(get_pool(), pool)
+
+    def test_lru_cache(self):
+        with LRUCache("test/lru", 5) as cache:
+            cache.trunc()
+            cache.add(*range(10))
+            self.assertEqual(cache.all(), [5, 6, 7, 8, 9])
+            cache.add(7, 7, 9)
+            self.assertEqual(cache.all(), [8, 9, 7, 7, 9])
+            # 많이 추가된 순서, 같으면 먼저 추가된 순서
+            self.assertEqual(cache.counter(), [9, 7, 8])
+            self.assertEqual(cache.counter(limit=1), [9])
+            # 본문은 한번만 올라가고 이후에는 EVALSHA로 실행됨
+            sha = cache.client.register_script(LRUCache.counter_script).sha
+            self.assertEqual(cache.client.script_exists(sha), [True])
+            cache.add()
+            self.assertEqual(len(cache.all()), 5)
+            cache.trunc()
+            self.assertEqual(cache.counter(), [])
+
+        LRUCache.add_many({"test/lru:1": [1, 2, 3], "test/lru:2": iter([4])}, 2)
+        with LRUCache("test/lru:1", 2) as first, LRUCache("test/lru:2", 2) as second:
+            self.assertEqual(first.all(), [2, 3])
+            self.assertEqual(second.all(), [4])
+            first.trunc()
+            second.trunc()
+
+    def test_trending_cache(self):
+        with TrendingCache("test/trending") as cache:
+            cache.trunc()
+            now = localtime()
+            cache.add(1, weights=3, created_at=now - timedelta(hours=10))
+            cache.add(2, 2)
+            cache.add(3, created_at=now - timedelta(days=2))  # 윈도우 밖의 버킷
+            # 10시간 전의 3점은 감쇠되어 방금 추가된 2점보다 낮음
+            self.assertEqual(cache.counter(), [2, 1])
+            self.assertEqual(cache.counter(limit=1), [2])
+
+            cache.remove_out_dated(now - timedelta(hours=1), min_items_count=1)
+            self.assertEqual(cache.counter(), [2])
+            cache.trunc()
+            self.assertEqual(cache.counter(), [])
+
+        with self.assertRaises(ValueError):
+            TrendingCache("test/trending", half_life_buckets=0)
+
     def test_celery(self):
         from .tasks import debug_task
 
@@ -51,3 +119,21 @@ class TestCommon(TestCase):
         three = debug_task.delay()
 
         print(one.get(), two.get(), three.get())
+
+
+class TestHealth(APITestCase):
+    def test_redis_pool_metrics(self):
+        resp = self.client.get("/_/health/redis_pool/")
+        self.assertEqual(resp.status_code, 401)
+
+        self.client.login(self.user)
+        resp = self.client.get("/_/health/redis_pool/")
+        self.assertEqual(resp.status_code, 403)
+
+        self.user2.is_staff = True
+        self.user2.save()
+        self.client.login(self.user2)
+        resp = self.client.get("/_/health/redis_pool/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["in_use_connections"], 0)
+        self.assertIn("max_connections", resp.json())
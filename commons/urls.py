@@ -0,0 +1,8 @@
+from rest_framework import routers
+from .views import HealthViewSet
+
+router = routers.DefaultRouter()
+router.register("health", HealthViewSet, basename="health")
+
+
+urlpatterns = router.urls
@@ -0,0 +1,18 @@
+from rest_framework import serializers
+from rest_framework.response import Response
+from rest_framework.decorators import action
+
+from commons import permissions
+from commons.viewsets import GenericViewSet
+
+from .lock import get_pool_metrics
+
+
+class HealthViewSet(GenericViewSet):
+    permission_classes = [permissions.StaffOnly]
+    serializer_class = serializers.Serializer
+
+    @action(methods=["GET"], detail=False, url_path="redis_pool")
+    def redis_pool(self, *args, **kwargs):
+        # 요청을 처리한 프로세스의 Redis 커넥션 풀 상태
+        return Response(get_pool_metrics())
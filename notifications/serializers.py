@@ -1,4 +1,7 @@
+from django.db import models
+
 from commons.serializers import BaseModelSerializer, serializers
+from relations.service import SocialGraphCache
 from users.serializers import UserSerializer
 
 from posts.serializers import RepostSerializer, FavoriteSerializer, MentionSerializer
@@ -6,9 +9,35 @@ from posts.serializers import RepostSerializer, FavoriteSerializer, MentionSeria
 from .models import Notification, Post, Repost, User, Favorite, Follow
 
 
+def hydrate_users(context: dict, notifications: "list[Notification]"):
+    # 알림들에 중첩된 유저(받는/보낸 유저, 멘션/리포스트/좋아요한 유저)와의 관계를 한번에 채워넣음
+    users: list[User] = []
+    for notification in notifications:
+        users += [notification.user, notification.from_user]
+        if notification.mentioned_post:
+            users.append(notification.mentioned_post.mentioned_to)
+        if notification.reposted_post:
+            users.append(notification.reposted_post.user)
+        if notification.favorited_post:
+            users.append(notification.favorited_post.user)
+    request = context.get("request", None)
+    SocialGraphCache(getattr(request, "user", None)).hydrate(users)
+
+
+class NotificationListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        notifications = (
+            data.all() if isinstance(data, models.manager.BaseManager) else data
+        )
+        notifications = list(notifications)
+        hydrate_users(self.context, notifications)
+        return super().to_representation(notifications)
+
+
 class NotificationSerializer(BaseModelSerializer):
     class Meta:
         model = Notification
+        list_serializer_class = NotificationListSerializer
         fields = (
             "id",
             "user",
@@ -33,3 +62,9 @@ class NotificationSerializer(BaseModelSerializer):
     followed_user = serializers.PrimaryKeyRelatedField(queryset=Follow.objects.all())
     replied_post = serializers.PrimaryKeyRelatedField(queryset=Post.objects.all())
     text = serializers.CharField()
+
+    def to_representation(self, instance):
+        # 목록이면 NotificationListSerializer가 페이지 단위로 이미 채워넣음
+        if self.parent is None:
+            hydrate_users(self.context, [instance])
+        return super().to_representation(instance)
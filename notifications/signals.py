@@ -5,6 +5,20 @@ from .serializers import NotificationSerializer
 from users.consumers import UserConsumer
 
 
+def send_notifications(notifications: list[Notification]):
+    # bulk_create로 만들어진 알림은 post_save를 보내지 않으므로 한번에 조회해 직접 전송
+    if not notifications:
+        return
+    qs = Notification.concrete_queryset().filter(
+        pk__in=[notification.pk for notification in notifications]
+    )
+    for notification in qs:
+        serializer = NotificationSerializer(notification)
+        UserConsumer.send_notification(
+            notification.user_id, serializer.data  # type:ignore
+        )
+
+
 @receiver(post_save, sender=Notification)
 def on_notification_created(
     sender: type[Notification], instance: Notification, created: bool, **kwargs
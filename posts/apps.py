@@ -9,6 +9,12 @@ class PostsConfig(AppConfig):
         from .signals import (
             on_favorite_created,
             on_post_created,
+            on_post_counted,
+            on_post_saved_invalidate_pages,
+            on_repost_changed_invalidate_pages,
             on_repost_created,
             on_mention_created,
+            on_following_added_to_timeline,
+            on_follow_created_to_timeline,
+            on_following_removed_from_timeline,
         )
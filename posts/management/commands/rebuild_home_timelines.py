@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from relations.models import Follow
+from users.models import User
+from ...services.timeline_service import HomeTimelineService
+
+
+class Command(BaseCommand):
+    help = "Fill home timelines from current followings"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-ids", nargs="*", type=int, default=None)
+
+    def handle(self, *args, user_ids=None, **options):
+        users = User.objects.all()
+        if user_ids:
+            users = users.filter(pk__in=user_ids)
+        for user in users.iterator():
+            service = HomeTimelineService(user)
+            followings = Follow.objects.filter(followed_by=user).values_list(
+                "following_to", flat=True
+            )
+            for following_id in followings:
+                service.backfill(following_id)
+        HomeTimelineService.trim()
+        self.stdout.write("home timelines rebuilt")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Post
+
+
+class Command(BaseCommand):
+    help = "Recompute reply_row_number_desc of replies from their origin threads"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--origin-ids", nargs="*", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, origin_ids=None, batch_size=1000, **options):
+        fixed = Post.rebuild_reply_row_numbers(origin_ids, batch_size=batch_size)
+        self.stdout.write(f"{fixed} reply row numbers rebuilt")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...models import Post, PostCounter
+
+
+class Command(BaseCommand):
+    help = "Recompute post counters from views, favorites, replies, reposts and quotes"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--post-ids", nargs="*", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, post_ids=None, batch_size=1000, **options):
+        posts = Post.objects.all()
+        if post_ids:
+            posts = posts.filter(pk__in=post_ids)
+        fixed = PostCounter.reconcile(posts, batch_size=batch_size)
+        self.stdout.write(f"{fixed} post counters reconciled")
@@ -0,0 +1,66 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:36
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_post_counters(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    PostCounter = apps.get_model("posts", "PostCounter")
+
+    def count_of(model_name: str, field: str, **filters):
+        Model = apps.get_model("posts", model_name)
+        return models.functions.Coalesce(
+            models.Subquery(
+                Model.objects.filter(**{field: models.OuterRef("pk")}, **filters)
+                .order_by(field)
+                .values(field)
+                .annotate(count=models.Count("pk"))
+                .values("count")
+            ),
+            models.Value(0),
+        )
+
+    rows = Post.objects.annotate(
+        views_count=count_of("View", "post", deleted_at__isnull=True),
+        favorites_count=count_of("Favorite", "post", deleted_at__isnull=True),
+        replies_count=count_of("Post", "parent", deleted_at__isnull=True),
+        reposts_count=count_of("Repost", "post", deleted_at__isnull=True),
+        quotes_count=count_of("Post", "quote", deleted_at__isnull=True),
+    ).values(
+        "pk",
+        "views_count",
+        "favorites_count",
+        "replies_count",
+        "reposts_count",
+        "quotes_count",
+    )
+    PostCounter.objects.bulk_create(
+        [
+            PostCounter(post_id=row.pop("pk"), **row)
+            for row in rows.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0012_hashtag'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PostCounter',
+            fields=[
+                ('post', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to='posts.post')),
+                ('views_count', models.IntegerField(default=0)),
+                ('favorites_count', models.IntegerField(default=0)),
+                ('replies_count', models.IntegerField(default=0)),
+                ('reposts_count', models.IntegerField(default=0)),
+                ('quotes_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_post_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_reply_row_numbers(apps, schema_editor):
+    Post = apps.get_model("posts", "Post")
+    rows = (
+        Post.objects.filter(origin__isnull=False, deleted_at__isnull=True)
+        .annotate(
+            row_number=models.Window(
+                expression=models.functions.RowNumber(),
+                partition_by=[models.F("origin"), models.F("user_id")],
+                order_by=[models.F("created_at").desc(), models.F("pk").desc()],
+            )
+        )
+        .values_list("pk", "row_number")
+    )
+    Post.objects.bulk_update(
+        [
+            Post(pk=pk, reply_row_number_desc=row_number)
+            for pk, row_number in rows.iterator(chunk_size=1000)
+        ],
+        ["reply_row_number_desc"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('images', '0003_image_created_at_alter_image_url'),
+        ('posts', '0014_timelineentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='reply_row_number_desc',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['origin', 'user', 'created_at'], name='posts_post_origin__93ab27_idx'),
+        ),
+        migrations.RunPython(backfill_reply_row_numbers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-18 11:58
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicated_views(apps, schema_editor):
+    View = apps.get_model("posts", "View")
+    PostCounter = apps.get_model("posts", "PostCounter")
+    duplicateds = (
+        View.objects.order_by()
+        .values("user", "post")
+        .annotate(first_id=models.Min("pk"), count=models.Count("pk"))
+        .filter(count__gt=1)
+    )
+    for row in duplicateds.iterator(chunk_size=1000):
+        View.objects.filter(user=row["user"], post=row["post"]).exclude(
+            pk=row["first_id"]
+        ).delete()
+        PostCounter.objects.filter(post_id=row["post"]).update(
+            views_count=models.F("views_count") - (row["count"] - 1)
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_post_reply_row_number_desc'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_views, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='view',
+            constraint=models.UniqueConstraint(fields=('user', 'post'), name='unique_view_user_post'),
+        ),
+    ]
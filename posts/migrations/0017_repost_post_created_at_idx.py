@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0016_view_unique_user_post'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='repost',
+            index=models.Index(fields=['post', '-created_at'], name='posts_repos_post_id_fe016a_idx'),
+        ),
+    ]
@@ -1,8 +1,8 @@
 from typing import Self
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractBaseUser, AnonymousUser
 
-from commons.model_utils import make_property_field
+from commons.model_utils import CounterModel, make_property_field
 from commons.models import CommonModel
 from users.models import User
 from images.models import Image
@@ -20,26 +20,31 @@ class Post(CommonModel):
         "Post", on_delete=models.DO_NOTHING, related_name="quotes", null=True
     )
     depth = models.IntegerField(default=0)
+    reply_row_number_desc = models.IntegerField(
+        default=0
+    )  # origin에 대한 자신의 게시글을 마지막에 작성한 순서대로 나열한 값. reply확인에 사용. 답글 작성/삭제시 갱신
     text = models.TextField()
     blocks = models.JSONField(default=list)
     images: "models.ManyToManyField[Image,Post]" = models.ManyToManyField(Image)
 
+    class Meta:
+        indexes = [models.Index(fields=["origin", "user", "created_at"])]
+
     views: "models.Manager[View]"
     favorites: "models.Manager[Favorite]"
     bookmarks: "models.Manager[Bookmark]"
     reposts: "models.Manager[Repost]"
     mentions: "models.Manager[Mention]"
     hashtags: "models.Manager[Hashtag]"
+    counter: "PostCounter"
 
-    reply_row_number_desc = make_property_field(
-        0
-    )  # origin에 대한 자신의 게시글을 마지막에 작성한 순서대로 나열한 값. reply확인에 사용
     favorites_count = make_property_field(0)
     views_count = make_property_field(0)
     quotes_count = make_property_field(0)
     replies_count = make_property_field(0)
     reposts_count = make_property_field(0)
-    has_views = make_property_field(False)
+    # 요청유저 기준의 값들은 어노테이션하지 않고 ViewerFlagService가 페이지 단위로 채움
+    has_view = make_property_field(False)
     has_favorite = make_property_field(False)
     has_bookmark = make_property_field(False)
     has_quote = make_property_field(False)
@@ -50,7 +55,8 @@ class Post(CommonModel):
     is_reply_to_ai: int | None = make_property_field(None)
     is_quote_to_ai: int | None = make_property_field(None)
     is_mentioned_post: int | None = make_property_field(None)
-    relavant_repost: "list[Repost]|None"  # prefetch의 to_attr은 getter setter를 통하여 할당이 불가능해 보임
+    # ViewerFlagService가 latest_date를 기준으로 채워넣음
+    relavant_repost: "list[Repost]|None"
 
     @classmethod
     def __concrete_qs_base(
@@ -69,11 +75,11 @@ class Post(CommonModel):
                     "mentions",
                     Mention.objects.prefetch_related(
                         models.Prefetch(
-                            "mentioned_to", User.concrete_queryset(user=user)
+                            "mentioned_to",
+                            User.concrete_queryset(user=user, projection="card"),
                         )
                     ).all(),
                 ),
-                cls.get_latest_relevant_repost(user=user),
             )
             .annotate(
                 views_count=cls.get_views_count(),
@@ -81,16 +87,6 @@ class Post(CommonModel):
                 replies_count=cls.get_replies_count(),
                 reposts_count=cls.get_reposts_count(),
                 quotes_count=cls.get_quotes_count(),
-                has_view=cls.get_has_view(user),
-                has_favorite=cls.get_has_favorite(user),
-                has_bookmark=cls.get_has_bookmark(user),
-                has_repost=cls.get_has_repost(user),
-                has_quote=cls.get_has_quote(user),
-                is_post_user_following_request_user=cls.get_is_post_user_following_request_user(
-                    user
-                ),
-                is_user_following_post_user=cls.get_is_user_following_post_user(user),
-                reply_row_number_desc=cls.get_reply_row_number_desc(),
             )
         )
 
@@ -101,37 +97,77 @@ class Post(CommonModel):
         target_user: AbstractBaseUser | None = None,
         replace: models.QuerySet[Self] | None = None,
     ):
+        # 리포스트 노출 기준은 요청유저, target_user는 호출부 호환을 위해 받기만 함
         if user and not user.is_authenticated:
             user = None
-        repost_filter = models.Q(user__followers__followed_by=user) | models.Q(
-            user=user
-        )
-        if target_user and not target_user.is_authenticated:
-            target_user = None
-            repost_filter = models.Q(user=user) | models.Q(user=target_user)
         return cls.__concrete_qs_base(user, replace=replace).annotate(
-            latest_date=models.functions.Coalesce(
-                models.Subquery(
-                    Repost.objects.filter(post=models.OuterRef("pk"))
-                    .filter(repost_filter)
-                    .order_by("-created_at")
-                    .values("created_at")[:1],
-                ),
-                models.F("created_at"),
+            latest_date=cls.get_latest_date(user)
+        )
+
+    @classmethod
+    def get_visible_reposts(cls, user: AbstractBaseUser):
+        # 요청유저 자신과 팔로잉들의 리포스트, Follow를 join하지 않고 IN 서브쿼리로 거름
+        followings = (
+            User.get_following_model()
+            .objects.filter(followed_by=user)  # type:ignore
+            .values("following_to")
+        )
+        return Repost.objects.filter(
+            models.Q(user=user) | models.Q(user__in=followings)
+        )
+
+    @classmethod
+    def get_latest_date(cls, user: AbstractBaseUser | None):
+        # 게시글이 요청유저에게 마지막으로 노출된 시점(작성 또는 보이는 리포스트)
+        if user == None:
+            return models.F("created_at")
+        return models.functions.Coalesce(
+            models.Subquery(
+                cls.get_visible_reposts(user)
+                .filter(post=models.OuterRef("pk"))
+                .order_by("-created_at")
+                .values("created_at")[:1],
             ),
+            models.F("created_at"),
         )
 
     @classmethod
-    def get_views_count(
-        cls,
-    ):
-        return models.Subquery(
-            View.objects.filter(post=models.OuterRef("pk"))
-            .order_by("post")
-            .values("post")
-            .annotate(count=models.Count("pk"))
-            .values("count")
+    def get_latest_visible_reposts(
+        cls, user: AbstractBaseUser | None, posts: list["Post"]
+    ) -> dict[int, "Repost"]:
+        """
+        latest_date를 계산한 리포스트를 페이지 단위로 한번에 조회
+        latest_date가 작성시각과 다르면 (게시글, latest_date)에 해당하는 리포스트가 노출된 리포스트임
+        """
+        latest_dates = {
+            post.pk: latest_date
+            for post in posts
+            if (latest_date := getattr(post, "latest_date", None))
+            and latest_date != post.created_at
+        }
+        if user == None or not latest_dates:
+            return {}
+        reposts = (
+            cls.get_visible_reposts(user)
+            .filter(
+                post_id__in=latest_dates.keys(),
+                created_at__in=set(latest_dates.values()),
+            )
+            .prefetch_related(
+                models.Prefetch(
+                    "user", User.concrete_queryset(user=user, projection="card")
+                )
+            )
         )
+        return {
+            repost.post_id: repost
+            for repost in reposts
+            if latest_dates[repost.post_id] == repost.created_at
+        }
+
+    @classmethod
+    def get_views_count(cls):
+        return PostCounter.get_count("views_count")
 
     @classmethod
     def get_has_view(cls, user: AbstractBaseUser | None = None):
@@ -142,47 +178,20 @@ class Post(CommonModel):
         )
 
     @classmethod
-    def get_favorites_count(
-        cls,
-    ):
-        return models.Subquery(
-            Favorite.objects.filter(post=models.OuterRef("pk"))
-            .order_by("post")
-            .values("post")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
+    def get_favorites_count(cls):
+        return PostCounter.get_count("favorites_count")
 
     @classmethod
     def get_replies_count(cls):
-        return models.Subquery(
-            Post.objects.filter(parent=models.OuterRef("pk"))
-            .order_by("parent")
-            .values("parent")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
-        return models.Count("replies")
+        return PostCounter.get_count("replies_count")
 
     @classmethod
     def get_reposts_count(cls):
-        return models.Subquery(
-            Repost.objects.filter(post=models.OuterRef("pk"))
-            .order_by("post")
-            .values("post")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
+        return PostCounter.get_count("reposts_count")
 
     @classmethod
     def get_quotes_count(cls):
-        return models.Subquery(
-            Post.objects.filter(quote=models.OuterRef("pk"))
-            .order_by("quote")
-            .values("quote")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
+        return PostCounter.get_count("quotes_count")
 
     @classmethod
     def get_has_favorite(cls, user: AbstractBaseUser | None = None):
@@ -217,45 +226,68 @@ class Post(CommonModel):
         )
 
     @classmethod
-    def get_latest_relevant_repost(cls, user: AbstractBaseUser | None):
-        if user == None:
-            return models.Prefetch(
-                "reposts",
-                Repost.objects.filter(pk=0).order_by("-created_at")[:1],
-                to_attr="relavant_repost",
-            )
+    def get_reply_thread(cls, post: "Post"):
+        return cls.objects.filter(
+            origin_id=post.origin_id, user_id=post.user_id, deleted_at__isnull=True
+        )
+
+    @classmethod
+    def lock_reply_thread(cls, post: "Post"):
+        # 같은 origin에 동시에 답글을 쓰거나 지울 때 번호가 겹치지 않도록 origin 행을 잠금
+        # 트랜잭션 안에서 호출해야하며 커밋될 때까지 유지됨
+        list(cls.objects.select_for_update().filter(pk=post.origin_id).values("pk"))
 
-        return models.Prefetch(
-            "reposts",
-            Repost.objects.prefetch_related(
-                models.Prefetch("user", User.concrete_queryset(user=user))
+    @classmethod
+    def push_reply_row_number(cls, post: "Post"):
+        # 새 답글이 1이 되고 같은 origin에 작성한 자신의 이전 답글들은 한칸씩 밀림
+        if post.origin_id == None:
+            return
+        with transaction.atomic():
+            cls.lock_reply_thread(post)
+            cls.get_reply_thread(post).exclude(pk=post.pk).update(
+                reply_row_number_desc=models.F("reply_row_number_desc") + 1
             )
-            .filter(models.Q(user__followers__followed_by=user) | models.Q(user=user))
-            .order_by("-created_at")[:1],
-            to_attr="relavant_repost",
-        )
+            cls.objects.filter(pk=post.pk).update(reply_row_number_desc=1)
+        post.reply_row_number_desc = 1
+
+    @classmethod
+    def pull_reply_row_number(cls, post: "Post"):
+        # 삭제된 답글보다 이전에 작성한 답글들을 한칸씩 당김
+        if post.origin_id == None or post.reply_row_number_desc == 0:
+            return
+        with transaction.atomic():
+            cls.lock_reply_thread(post)
+            cls.get_reply_thread(post).exclude(pk=post.pk).filter(
+                reply_row_number_desc__gt=post.reply_row_number_desc
+            ).update(reply_row_number_desc=models.F("reply_row_number_desc") - 1)
 
     @classmethod
-    def get_reply_row_number_desc(cls):
-        return models.Case(
-            models.When(origin__isnull=True, then=models.Value(0)),
-            default=models.Window(
+    def rebuild_reply_row_numbers(
+        cls, origin_ids: "list[int] | None" = None, batch_size=1000
+    ):
+        """
+        답글들의 reply_row_number_desc를 윈도우 함수로 다시 계산하여 어긋난 값만 기록한다.
+        수정된 게시글의 수를 반환
+        """
+        posts = cls.objects.filter(origin__isnull=False, deleted_at__isnull=True)
+        if origin_ids:
+            posts = posts.filter(origin_id__in=origin_ids)
+        rows = posts.annotate(
+            row_number=models.Window(
                 expression=models.functions.RowNumber(),
-                partition_by=[
-                    models.F("origin"),
-                    models.F("user_id"),
-                ],
-                order_by=models.F("created_at").desc(),
-            ),
-        )
-        return models.Window(
-            expression=models.functions.RowNumber(),
-            partition_by=[
-                models.F("origin"),
-                models.F("user_id"),
-            ],
-            order_by=models.F("created_at").desc(),
+                partition_by=[models.F("origin"), models.F("user_id")],
+                order_by=[models.F("created_at").desc(), models.F("pk").desc()],
+            )
+        ).values_list("pk", "row_number", "reply_row_number_desc")
+        drifted = [
+            cls(pk=pk, reply_row_number_desc=row_number)
+            for pk, row_number, current in rows.iterator(chunk_size=batch_size)
+            if row_number != current
+        ]
+        cls.objects.bulk_update(
+            drifted, ["reply_row_number_desc"], batch_size=batch_size
         )
+        return len(drifted)
 
     @classmethod
     def get_is_post_user_following_request_user(cls, user: AbstractBaseUser | None):
@@ -290,6 +322,13 @@ class Post(CommonModel):
 class View(CommonModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="views")
 
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_view_user_post"
+            )
+        ]
+
 
 class Favorite(CommonModel):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="favorites")
@@ -300,8 +339,12 @@ class Bookmark(CommonModel):
 
 
 class Repost(CommonModel):
+    post_id: int
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="reposts")
 
+    class Meta:
+        indexes = [models.Index(fields=["post", "-created_at"])]
+
 
 class Mention(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="mentions")
@@ -313,3 +356,79 @@ class Mention(models.Model):
 class Hashtag(models.Model):
     post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="hashtags")
     text = models.CharField(max_length=512)
+
+
+class TimelineEntry(models.Model):
+    """
+    팔로잉 타임라인(timeline/followings)에 미리 기록해두는 게시글.
+    게시글/리포스트 생성시 작성자의 팔로워들에게 기록(fan-out-on-write)되며,
+    latest_date는 해당 유저에게 게시글이 마지막으로 노출된 시점(작성 또는 리포스트).
+    """
+
+    class Meta:
+        indexes = [models.Index(fields=["user", "-latest_date"])]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "post"], name="unique_timeline_entry_user_post"
+            )
+        ]
+
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    post = models.ForeignKey(
+        Post, on_delete=models.CASCADE, related_name="timeline_entries"
+    )
+    latest_date = models.DateTimeField()
+
+
+class PostCounter(CounterModel):
+    """
+    게시글별 집계값을 저장하는 테이블.
+    매 조회마다 하위 테이블을 COUNT하는 대신 생성/삭제 시점에 값을 증감시키고,
+    어긋난 값은 reconcile_post_counters 커맨드로 바로잡는다.
+    """
+
+    post = models.OneToOneField(
+        Post, on_delete=models.CASCADE, primary_key=True, related_name="counter"
+    )
+    views_count = models.IntegerField(default=0)
+    favorites_count = models.IntegerField(default=0)
+    replies_count = models.IntegerField(default=0)
+    reposts_count = models.IntegerField(default=0)
+    quotes_count = models.IntegerField(default=0)
+
+    owner_field = "post"
+    count_fields = (
+        "views_count",
+        "favorites_count",
+        "replies_count",
+        "reposts_count",
+        "quotes_count",
+    )
+    # create_bool_child_mixin의 child_str과 카운터 필드의 매핑
+    child_count_fields = {
+        "views": "views_count",
+        "favorites": "favorites_count",
+        "reposts": "reposts_count",
+    }
+
+    @classmethod
+    def increase(cls, post_id: int, **deltas: int):
+        cls.increase_many({post_id: deltas})
+
+    @classmethod
+    def increase_child(cls, post_id: int, child_str: str, delta: int):
+        if not (field := cls.child_count_fields.get(child_str)):
+            return
+        cls.increase(post_id, **{field: delta})
+
+    @classmethod
+    def get_count_subqueries(cls):
+        return dict(
+            views_count=cls.count_of(View.objects.all(), "post"),
+            favorites_count=cls.count_of(Favorite.objects.all(), "post"),
+            replies_count=cls.count_of(Post.objects.all(), "parent"),
+            reposts_count=cls.count_of(Repost.objects.all(), "post"),
+            quotes_count=cls.count_of(Post.objects.all(), "quote"),
+        )
@@ -1,3 +1,7 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
 from commons.decorators import inject_user
 from commons.serializers import BaseModelSerializer, serializers
 from images.serializers import ImageSerializer
@@ -5,6 +9,7 @@ from users.models import User
 from users.serializers import UserSerializer
 
 from .models import Post, Favorite, Bookmark, Repost, Mention, View, models, Hashtag
+from .services.viewer_flag_service import ViewerFlagService
 
 
 class MentionSerializer(BaseModelSerializer[Mention]):
@@ -61,10 +66,33 @@ class TextTextSerializer(serializers.Serializer):
     value = serializers.CharField(required=True)
 
 
+class PostListSerializer(serializers.ListSerializer):
+    fragments: dict[str, dict] | None = None
+    new_fragments: dict[str, dict]
+
+    def to_representation(self, data):
+        posts = data.all() if isinstance(data, models.manager.BaseManager) else data
+        request = self.context.get("request", None)
+        posts = ViewerFlagService(getattr(request, "user", None)).hydrate(posts)
+        get_fragment_key = getattr(self.child, "get_fragment_key", None)
+        if not get_fragment_key:
+            return super().to_representation(posts)
+        # 페이지의 캐시된 조각들을 한번에 가져오고, 새로 만들어진 조각들을 한번에 저장
+        self.fragments = cache.get_many([get_fragment_key(post) for post in posts])
+        self.new_fragments = {}
+        result = super().to_representation(posts)
+        if self.new_fragments:
+            cache.set_many(
+                self.new_fragments, timeout=settings.POST_FRAGMENT_CACHE_TIMEOUT
+            )
+        return result
+
+
 @inject_user
 class PostSerializer(BaseModelSerializer[Post]):
     class Meta:
         model = Post
+        list_serializer_class = PostListSerializer
         fields = (
             "id",
             "text",
@@ -121,6 +149,12 @@ class PostSerializer(BaseModelSerializer[Post]):
     relavant_repost = serializers.SerializerMethodField()
     reply_row_number_desc = serializers.IntegerField(read_only=True)
 
+    def to_representation(self, instance):
+        if not isinstance(self.parent, PostListSerializer):
+            request = self.context.get("request", None)
+            ViewerFlagService(getattr(request, "user", None)).hydrate([instance])
+        return super().to_representation(instance)
+
     def get_relavant_repost(self, obj: Post):
         if getattr(obj, "relavant_repost", None):
             return UserSerializer(
@@ -143,7 +177,9 @@ class PostSerializer(BaseModelSerializer[Post]):
         if parent:
             validated_data["depth"] = parent.depth + 1
         tags = self.export_hash_tags_from_text(validated_data["text"])
-        instance: Post = super().create(validated_data)
+        with transaction.atomic():
+            instance: Post = super().create(validated_data)
+            Post.push_reply_row_number(instance)
         if tags:
             instance.hashtags.bulk_create(
                 [Hashtag(post=instance, text=tag) for tag in tags]
@@ -166,11 +202,80 @@ class PostSerializer(BaseModelSerializer[Post]):
 
 
 class PostReadOnlySerializer(PostSerializer):
+    # 요청유저와 상관없고 게시글이 수정되어야만 바뀌는 값들, (id, updated_at) 단위로 캐시됨
+    # 작성자와 멘션된 유저는 게시글과 상관없이 바뀌므로 매번 다시 채워넣음
+    fragment_fields = (
+        "id",
+        "text",
+        "blocks",
+        "created_at",
+        "mentions",
+        "images",
+        "parent",
+        "origin",
+        "quote",
+        "depth",
+        "deleted_at",
+    )
+
     text = serializers.SerializerMethodField()
     blocks = serializers.SerializerMethodField()
     mentions = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
 
+    @staticmethod
+    def get_fragment_key(post: Post):
+        return f"post_fragment/{post.pk}:{post.updated_at.timestamp()}"
+
+    def to_representation(self, instance):
+        key = self.get_fragment_key(instance)
+        in_list = isinstance(self.parent, PostListSerializer)
+        if in_list:
+            fragment = (self.parent.fragments or {}).get(key, None)
+        else:
+            fragment = cache.get(key)
+
+        if fragment == None:
+            data = super().to_representation(instance)
+            fragment = {name: data[name] for name in self.fragment_fields}
+            if in_list:
+                self.parent.new_fragments[key] = fragment
+            else:
+                cache.set(key, fragment, timeout=settings.POST_FRAGMENT_CACHE_TIMEOUT)
+            return data
+        if not in_list:
+            request = self.context.get("request", None)
+            ViewerFlagService(getattr(request, "user", None)).hydrate([instance])
+        return self.overlay(instance, fragment)
+
+    def overlay(self, instance: Post, fragment: dict):
+        data = dict(fragment)
+        for field in self._readable_fields:
+            if field.field_name in self.fragment_fields:
+                continue
+            attribute = field.get_attribute(instance)
+            data[field.field_name] = (
+                None if attribute is None else field.to_representation(attribute)
+            )
+        mentioned_users = {
+            mention.pk: mention.mentioned_to for mention in instance.mentions.all()
+        }
+        user_field = MentionSerializer(context=self.context).fields["mentioned_to"]
+        data["mentions"] = [
+            (
+                dict(
+                    mention,
+                    mentioned_to=user_field.to_representation(
+                        mentioned_users[mention["id"]]
+                    ),
+                )
+                if mention["id"] in mentioned_users
+                else mention
+            )
+            for mention in data["mentions"]
+        ]
+        return {name: data[name] for name in self.fields if name in data}
+
     def get_text(self, obj: Post):
         if obj.deleted_at:
             return ""
@@ -0,0 +1,57 @@
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+
+from commons.requests import Request
+
+
+class AnonymousPageCacheService:
+    """
+    비로그인 유저에게 보여지는 타임라인 페이지를 직렬화된 응답 그대로 짧게 캐시
+    1. (endpoint, 쿼리파라미터) 단위로 ANONYMOUS_PAGE_CACHE_TIMEOUT초 동안 유지
+    2. 작성자의 게시글/리포스트가 바뀌면 작성자의 버전을 올려 해당 작성자의 페이지들을 무효화
+    3. 작성자가 없는 페이지(timeline/global)는 전체 버전을 사용
+    """
+
+    def __init__(self, request: Request, endpoint: str, author_id: int | None = None):
+        self.request = request
+        self.endpoint = endpoint
+        self.author_id = author_id
+        self._key: str | None = None
+
+    @staticmethod
+    def get_version_key(author_id: int | None = None):
+        if author_id == None:
+            return "anonymous_pages/version"
+        return f"anonymous_pages/version:{author_id}"
+
+    @classmethod
+    def invalidate(cls, author_id: int | None = None):
+        key = cls.get_version_key(author_id)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, 1, timeout=None)
+
+    @property
+    def is_enabled(self):
+        return not self.request.user.is_authenticated
+
+    @property
+    def key(self):
+        if self._key == None:
+            version = cache.get(self.get_version_key(self.author_id), 0)
+            query = urlencode(sorted(self.request.query_params.items()))
+            self._key = f"anonymous_pages/{self.endpoint}:{version}?{query}"
+        return self._key
+
+    def get(self):
+        if not self.is_enabled:
+            return None
+        return cache.get(self.key)
+
+    def set(self, data):
+        if not self.is_enabled:
+            return
+        cache.set(self.key, data, timeout=settings.ANONYMOUS_PAGE_CACHE_TIMEOUT)
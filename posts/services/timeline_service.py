@@ -0,0 +1,174 @@
+from datetime import datetime
+from typing import Iterable
+
+from django.conf import settings
+
+from commons.lock import get_redis
+from relations.models import Follow
+from ..models import models, Post, Repost, TimelineEntry, User
+
+
+class HomeTimelineService:
+    """
+    팔로잉 타임라인을 TimelineEntry에 미리 기록해두고 조회하는 서비스
+    1. 게시글/리포스트가 생성되면 작성자의 팔로워들의 타임라인에 기록
+    2. 팔로워가 HOME_TIMELINE_FAN_OUT_MAX_FOLLOWERS보다 많은 유저의 게시글과 자신의 게시글은 조회시 합침
+    3. 타임라인마다 HOME_TIMELINE_MAX_ENTRIES개 까지만 유지
+    """
+
+    fan_out_on_read_key = "home_timeline/fan_out_on_read"
+
+    def __init__(self, user: User):
+        self.user = user
+
+    @classmethod
+    def push(
+        cls,
+        user_ids: Iterable[int],
+        post_id: int,
+        latest_date: datetime,
+        batch_size: int = 1000,
+    ):
+        entries = [
+            TimelineEntry(user_id=user_id, post_id=post_id, latest_date=latest_date)
+            for user_id in user_ids
+        ]
+        TimelineEntry.objects.bulk_create(
+            entries,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=["user", "post"],
+            update_fields=["latest_date"],
+        )
+
+    @classmethod
+    def get_fan_out_user_ids(cls, user_id: int) -> list[int]:
+        followers = Follow.objects.filter(following_to_id=user_id)
+        is_fan_out_on_read = (
+            settings.HOME_TIMELINE_FAN_OUT_MAX_FOLLOWERS < followers.count()
+        )
+        with get_redis() as client:
+            if is_fan_out_on_read:
+                client.sadd(cls.fan_out_on_read_key, user_id)
+                return []
+            client.srem(cls.fan_out_on_read_key, user_id)
+        return list(followers.values_list("followed_by_id", flat=True))
+
+    @classmethod
+    def fan_out_post(cls, post: Post):
+        if post.deleted_at:
+            return
+        cls.push(cls.get_fan_out_user_ids(post.user_id), post.pk, post.created_at)
+
+    @classmethod
+    def fan_out_repost(cls, repost: Repost):
+        user_ids = [repost.user_id, *cls.get_fan_out_user_ids(repost.user_id)]
+        cls.push(user_ids, repost.post_id, repost.created_at)
+
+    @classmethod
+    def trim(cls, max_entries: int | None = None):
+        if max_entries == None:
+            max_entries = settings.HOME_TIMELINE_MAX_ENTRIES
+        outdateds = (
+            TimelineEntry.objects.annotate(
+                rank=models.Window(
+                    expression=models.functions.RowNumber(),
+                    partition_by=[models.F("user")],
+                    order_by=models.F("latest_date").desc(),
+                )
+            )
+            .filter(rank__gt=max_entries)
+            .values("pk")
+        )
+        return TimelineEntry.objects.filter(pk__in=outdateds).delete()
+
+    def backfill(self, target_user_id: int):
+        # 새로 팔로우한 유저의 최근 게시글과 리포스트를 타임라인에 채워넣음
+        size = settings.HOME_TIMELINE_BACKFILL_SIZE
+        posts = (
+            Post.objects.filter(user_id=target_user_id, deleted_at__isnull=True)
+            .order_by("-created_at")
+            .values_list("pk", "created_at")[:size]
+        )
+        reposts = (
+            Repost.objects.filter(user_id=target_user_id)
+            .order_by("-created_at")
+            .values_list("post_id", "created_at")[:size]
+        )
+        latest_dates: dict[int, datetime] = {}
+        for post_id, created_at in [*posts, *reposts]:
+            if latest_dates.get(post_id, created_at) <= created_at:
+                latest_dates[post_id] = created_at
+
+        already = dict(
+            TimelineEntry.objects.filter(
+                user=self.user, post_id__in=latest_dates.keys()
+            ).values_list("post_id", "latest_date")
+        )
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user=self.user, post_id=post_id, latest_date=latest_date)
+                for post_id, latest_date in latest_dates.items()
+                if already.get(post_id, latest_date) <= latest_date
+            ],
+            update_conflicts=True,
+            unique_fields=["user", "post"],
+            update_fields=["latest_date"],
+        )
+
+    def remove(self, target_user_id: int):
+        # 언팔로우한 유저의 게시글과 리포스트를 타임라인에서 제거
+        # 여전히 팔로우중인 유저가 쓰거나 리포스트한 게시글, 자신이 리포스트한 게시글은 남겨둠
+        followings = Follow.objects.filter(followed_by=self.user).values("following_to")
+        (
+            TimelineEntry.objects.filter(user=self.user)
+            .filter(
+                models.Q(post__user_id=target_user_id)
+                | models.Q(post__reposts__user_id=target_user_id)
+            )
+            .exclude(post__user__in=followings)
+            .exclude(post__reposts__user__in=followings)
+            .exclude(post__reposts__user=self.user)
+            .delete()
+        )
+
+    def get_fan_out_on_read_followings(self) -> list[int]:
+        with get_redis() as client:
+            user_ids = list(map(int, client.smembers(self.fan_out_on_read_key)))
+        if not user_ids:
+            return []
+        return list(
+            Follow.objects.filter(
+                followed_by=self.user, following_to__in=user_ids
+            ).values_list("following_to", flat=True)
+        )
+
+    def get_entries(
+        self, offset: str | None, direction: str, size: int
+    ) -> list[tuple[int, datetime]]:
+        """
+        타임라인의 (게시글 id, latest_date)를 최신순으로 size개까지 반환
+        TimelineEntry는 (user, -latest_date) 인덱스로 페이지만큼만 읽고,
+        자신과 fan-out-on-read 팔로잉들의 게시글은 같은 구간에서 size개까지만 읽어 합침
+        """
+        window = {f"latest_date{direction}": offset} if offset else {}
+        entries = list(
+            TimelineEntry.objects.filter(
+                user=self.user, post__deleted_at__isnull=True, **window
+            )
+            .order_by("-latest_date", "-post_id")
+            .values_list("post_id", "latest_date")[:size]
+        )
+        window = {f"created_at{direction}": offset} if offset else {}
+        authors = [self.user.pk, *self.get_fan_out_on_read_followings()]
+        # 타임라인에 기록된 게시글은 기록된 latest_date로만 노출
+        posts = list(
+            Post.objects.filter(user__in=authors, **window)
+            .exclude(timeline_entries__user=self.user)
+            .order_by("-created_at", "-pk")
+            .values_list("pk", "created_at")[:size]
+        )
+        merged = sorted(
+            [*entries, *posts], key=lambda entry: (entry[1], entry[0]), reverse=True
+        )
+        return merged[:size]
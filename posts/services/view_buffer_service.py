@@ -0,0 +1,111 @@
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.timezone import localtime
+
+from commons.lock import get_redis
+from ..models import Post, PostCounter, User, View
+
+
+class ViewBufferService:
+    """
+    조회(View)를 요청마다 저장하지 않고 Redis 리스트에 쌓아둔 뒤 주기적으로 한번에 저장
+    1. 요청시에는 RPUSH 한번만 실행
+    2. flush_view_buffer 태스크가 (user, post) 단위로 중복을 제거하고 한번에 저장
+    3. 중복 저장은 View의 (user, post) 유니크 제약이 막고, 실제로 저장된 행만 카운트
+    """
+
+    key = "post_views/buffer"
+
+    @classmethod
+    def push(cls, post_id: int | str, user_id: int):
+        with get_redis() as client:
+            client.rpush(cls.key, f"{post_id}:{user_id}")
+
+    @classmethod
+    def pop(cls, size: int) -> list[tuple[int, int]]:
+        with get_redis() as client:
+            values: list[bytes] = client.lpop(cls.key, size) or []  # type:ignore
+        pairs: list[tuple[int, int]] = []
+        for value in values:
+            post_id, _, user_id = value.decode().partition(":")
+            if post_id.isdigit() and user_id.isdigit():
+                pairs.append((int(post_id), int(user_id)))
+        return pairs
+
+    @classmethod
+    def flush(cls, batch_size: int | None = None) -> list[View]:
+        # 버퍼가 비거나 batch_size보다 적게 꺼내질 때까지 반복, 새로 저장된 조회들을 반환
+        if batch_size == None:
+            batch_size = settings.VIEW_BUFFER_FLUSH_SIZE
+        created: list[View] = []
+        while True:
+            pairs = cls.pop(batch_size)
+            created += cls.write(set(pairs))
+            if len(pairs) < batch_size:
+                return created
+
+    @classmethod
+    def write(cls, pairs: set[tuple[int, int]]) -> list[View]:
+        if not pairs:
+            return []
+        post_ids = {post_id for post_id, _ in pairs}
+        user_ids = {user_id for _, user_id in pairs}
+        existing_posts = set(
+            Post.objects.filter(pk__in=post_ids).values_list("pk", flat=True)
+        )
+        existing_users = set(
+            User.objects.filter(pk__in=user_ids).values_list("pk", flat=True)
+        )
+        already = set(
+            View.objects.filter(post_id__in=post_ids, user_id__in=user_ids).values_list(
+                "post_id", "user_id"
+            )
+        )
+        pairs = {
+            (post_id, user_id)
+            for post_id, user_id in pairs
+            if post_id in existing_posts
+            and user_id in existing_users
+            and (post_id, user_id) not in already
+        }
+        with transaction.atomic():
+            views = cls.insert(pairs)
+            PostCounter.increase_many(
+                {
+                    post_id: dict(views_count=count)
+                    for post_id, count in Counter(v.post_id for v in views).items()
+                }
+            )
+        return views
+
+    @classmethod
+    def insert(cls, pairs: set[tuple[int, int]], batch_size: int = 1000) -> list[View]:
+        """
+        bulk_create(ignore_conflicts=True)는 충돌로 건너뛴 행을 알려주지 않음
+        동시에 실행된 flush나 다른 요청이 먼저 저장한 조회를 다시 카운트하지 않도록
+        ON CONFLICT DO NOTHING RETURNING으로 실제로 저장된 행만 돌려받음
+        """
+        pairs_list = list(pairs)
+        now = localtime()
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(View._meta.get_field(name).column)
+            for name in ("post", "user", "created_at", "updated_at")
+        )
+        views: list[View] = []
+        with connection.cursor() as cursor:
+            for start in range(0, len(pairs_list), batch_size):
+                batch = pairs_list[start : start + batch_size]
+                cursor.execute(
+                    f"INSERT INTO {quote(View._meta.db_table)} ({columns}) "
+                    f"VALUES {', '.join(['(%s, %s, %s, %s)'] * len(batch))} "
+                    "ON CONFLICT DO NOTHING RETURNING id, post_id, user_id",
+                    [value for pair in batch for value in (*pair, now, now)],
+                )
+                views += [
+                    View(pk=pk, post_id=post_id, user_id=user_id)
+                    for pk, post_id, user_id in cursor.fetchall()
+                ]
+        return views
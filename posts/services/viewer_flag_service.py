@@ -0,0 +1,103 @@
+from typing import Iterable
+
+from django.contrib.auth.models import AbstractBaseUser
+
+from relations.service import SocialGraphCache
+from ..models import Post, View, Favorite, Bookmark, Repost, Mention, User
+
+
+class ViewerFlagService:
+    """
+    페이지네이션이 끝난 게시글들에 요청유저 기준의 값(has_favorite, has_bookmark...)을 채워넣음
+    게시글마다 Exists 서브쿼리를 돌리는 대신 관계마다 post_id IN (...) 쿼리를 한번씩만 실행
+    작성자/멘션/리포스트 유저와의 팔로우 관계는 SocialGraphCache에서 한번에 확인
+    relavant_repost는 latest_date에 해당하는 리포스트를 한번에 조회해 채움
+    """
+
+    child_models = dict(
+        has_view=View,
+        has_favorite=Favorite,
+        has_bookmark=Bookmark,
+        has_repost=Repost,
+    )
+    flag_fields = (
+        *child_models.keys(),
+        "has_quote",
+        "is_post_user_following_request_user",
+        "is_user_following_post_user",
+    )
+
+    def __init__(self, user: AbstractBaseUser | None = None):
+        if user and not user.is_authenticated:
+            user = None
+        self.user = user
+
+    def hydrate(self, posts: Iterable[Post]):
+        posts = list(posts)
+        if not posts:
+            return posts
+        # latest_date를 계산한 리포스트를 페이지 단위로 한번에 채워넣음
+        reposts = Post.get_latest_visible_reposts(self.user, posts)
+        for post in posts:
+            repost = reposts.get(post.pk, None)
+            post.relavant_repost = [repost] if repost else []
+        if self.user == None:
+            for post in posts:
+                for field in self.flag_fields:
+                    setattr(post, field, False)
+            return posts
+
+        post_ids = {post.pk for post in posts}
+        user_ids = {post.user_id for post in posts}
+        flags: dict[str, set[int]] = {
+            field: set(
+                Model.objects.filter(user=self.user, post_id__in=post_ids).values_list(
+                    "post_id", flat=True
+                )
+            )
+            for field, Model in self.child_models.items()
+        }
+        flags["has_quote"] = set(
+            Post.objects.filter(user=self.user, quote_id__in=post_ids).values_list(
+                "quote_id", flat=True
+            )
+        )
+        users = self.get_loaded_users(posts)
+        graph = SocialGraphCache(self.user)
+        relations = graph.get_relations({*user_ids, *(user.pk for user in users)})
+        graph.apply(users, relations)
+        flags["is_post_user_following_request_user"] = {
+            pk for pk, (_, followed_by_at) in relations.items() if followed_by_at
+        }
+        flags["is_user_following_post_user"] = {
+            pk for pk, (following_at, _) in relations.items() if following_at
+        }
+        user_flags = (
+            "is_post_user_following_request_user",
+            "is_user_following_post_user",
+        )
+        for post in posts:
+            for field in self.flag_fields:
+                key = post.user_id if field in user_flags else post.pk
+                setattr(post, field, key in flags[field])
+        return posts
+
+    @staticmethod
+    def get_loaded_users(posts: list[Post]) -> list[User]:
+        # 게시글과 함께 불러온 작성자, 멘션된 유저, 리포스트한 유저 (추가 쿼리 없이)
+        users: list[User] = []
+        for post in posts:
+            if Post.user.is_cached(post):
+                users.append(post.user)
+            prefetched = getattr(post, "_prefetched_objects_cache", {})
+            mentions: list[Mention] = list(prefetched.get("mentions", []))
+            reposts: list[Repost] = getattr(post, "relavant_repost", [])
+            users += [
+                mention.mentioned_to
+                for mention in mentions
+                if Mention.mentioned_to.is_cached(mention)
+            ]
+            users += [
+                repost.user for repost in reposts if Repost.user.is_cached(repost)
+            ]
+        return users
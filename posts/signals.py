@@ -1,7 +1,11 @@
-from django.db.models.signals import post_save
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
-from .models import Post, Repost, Bookmark, Favorite, Mention
+from relations.models import Follow
+from .models import Post, PostCounter, Repost, Bookmark, Favorite, Mention
 
 
 @receiver(post_save, sender=Post)
@@ -11,9 +15,41 @@ def on_post_created(sender, instance: Post, **kwargs):
     on_post_created_task.delay(instance.pk)
 
 
+@receiver(post_save, sender=Post)
+def on_post_counted(sender, instance: Post, created: bool, **kwargs):
+    if not created:
+        return
+    deltas: dict[int, dict[str, int]] = {instance.pk: {}}
+    if instance.parent_id:
+        deltas.setdefault(instance.parent_id, {})["replies_count"] = 1
+    if instance.quote_id:
+        deltas.setdefault(instance.quote_id, {})["quotes_count"] = 1
+    PostCounter.increase_many(deltas)
+
+
+@receiver(post_save, sender=Post)
+def on_post_saved_invalidate_pages(sender, instance: Post, created: bool, **kwargs):
+    from .services.page_cache_service import AnonymousPageCacheService
+
+    AnonymousPageCacheService.invalidate(instance.user_id)
+    if not created:  # 수정/삭제된 게시글은 timeline/global에도 있을 수 있음
+        AnonymousPageCacheService.invalidate()
+
+
+@receiver(post_save, sender=Repost)
+@receiver(post_delete, sender=Repost)
+def on_repost_changed_invalidate_pages(sender, instance: Repost, **kwargs):
+    from .services.page_cache_service import AnonymousPageCacheService
+
+    AnonymousPageCacheService.invalidate(instance.user_id)
+
+
 @receiver(post_save, sender=Repost)
 def on_repost_created(sender, instance: Repost, **kwargs):
     from notifications.models import Notification
+    from .tasks import fan_out_repost_to_timelines
+
+    fan_out_repost_to_timelines.delay(instance.pk)
 
     noti = Notification()
     noti.user = instance.post.user
@@ -35,10 +71,53 @@ def on_favorite_created(sender, instance: Favorite, **kwargs):
 
 @receiver(post_save, sender=Mention)
 def on_mention_created(sender, instance: Mention, **kwargs):
+    from django.utils.timezone import localtime
     from notifications.models import Notification
 
+    # 멘션은 게시글 생성 후 따로 저장되므로 캐시된 게시글 조각이 갱신되도록 함
+    Post.objects.filter(pk=instance.post_id).update(updated_at=localtime())
     noti = Notification()
     noti.user = instance.mentioned_to
     noti.from_user = instance.post.user
     noti.mentioned_post = instance
     noti.save()
+
+
+@receiver(m2m_changed, sender=Follow)
+def on_following_added_to_timeline(sender, instance, **kwargs):
+    from .tasks import backfill_home_timeline
+
+    if kwargs.get("action") != "post_add" or kwargs.get("reverse"):
+        return
+    # 팔로우가 커밋된 이후에 채워야 워커에서 보임
+    for pk in kwargs.get("pk_set") or set():
+        transaction.on_commit(partial(backfill_home_timeline.delay, instance.pk, pk))
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created_to_timeline(sender, instance: Follow, created: bool, **kwargs):
+    from .tasks import backfill_home_timeline
+
+    if not created:
+        return
+    transaction.on_commit(
+        partial(
+            backfill_home_timeline.delay,
+            instance.followed_by_id,
+            instance.following_to_id,
+        )
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def on_following_removed_from_timeline(sender, instance: Follow, **kwargs):
+    from .tasks import remove_from_home_timeline
+
+    # 언팔로우가 커밋되기 전에 실행되면 아직 팔로우중으로 보여 아무것도 지우지 않음
+    transaction.on_commit(
+        partial(
+            remove_from_home_timeline.delay,
+            instance.followed_by_id,
+            instance.following_to_id,
+        )
+    )
@@ -1,7 +1,10 @@
+from datetime import datetime
+
 from django.apps import apps
+from django.conf import settings
 from django.utils.timezone import localtime, timedelta
-from django.db import models
-from commons.caches import LRUCache, TimeoutCache
+from django.db import models, transaction
+from commons.caches import LRUCache, TrendingCache
 from commons.celery import shared_task
 from commons.lock import get_redis
 
@@ -9,11 +12,13 @@ from commons.lock import get_redis
 @shared_task()
 def on_post_created_task(post_id: int):
     from .models import Post
+    from .services.timeline_service import HomeTimelineService
     from notifications.models import Notification
     from ai.tasks import create_ai_post
 
     if not (instance := Post.objects.filter(pk=post_id).first()):
         return
+    HomeTimelineService.fan_out_post(instance)
     flag = False
     noti = Notification()
     noti.from_user = instance.user
@@ -21,6 +26,7 @@ def on_post_created_task(post_id: int):
         flag = True
         noti.user = instance.parent.user
         noti.replied_post = instance
+        push_recommended_list.delay(instance.parent_id, get_weights("replies"))
     elif instance.quote:
         flag = True
         noti.user = instance.quote.user
@@ -30,16 +36,25 @@ def on_post_created_task(post_id: int):
     create_ai_post.delay(post_id=instance.pk)
 
 
-def get_weights(instance):
-    from .models import View, Favorite, Bookmark, Repost
+def get_recommended_cache():
+    return TrendingCache(
+        "post_recommended/v3",
+        half_life_buckets=settings.POST_RECOMMEND_HALF_LIFE_HOURS,
+    )
+
+
+def get_weights(child_str: str) -> int:
+    return settings.POST_RECOMMEND_WEIGHTS.get(child_str, 1)
+
 
-    if isinstance(instance, Favorite):
-        weights = 5
-    elif isinstance(instance, Bookmark):
-        weights = 2
-    elif isinstance(instance, Repost):
-        weights = 10
-    return 1
+def increase_child_counter(
+    Model: type[models.Model], instance_id: int, child_str: str, delta: int
+):
+    from .models import Post, PostCounter
+
+    if Model is not Post:
+        return
+    PostCounter.increase_child(instance_id, child_str, delta)
 
 
 @shared_task()
@@ -54,9 +69,10 @@ def create_child_model(model_path: str, child_str: str, instance_id: int, user_i
     if manager.filter(user_id=user_id).exists():
         return
 
-    instance = manager.create(user_id=user_id)
-    weights = get_weights(instance)
-    push_recommended_list.delay(instance_id, weights)
+    with transaction.atomic():
+        manager.create(user_id=user_id)
+        increase_child_counter(Model, instance_id, child_str, 1)
+    push_recommended_list.delay(instance_id, get_weights(child_str))
 
 
 @shared_task()
@@ -71,15 +87,24 @@ def delete_child_models(
     manager: models.Manager[models.Model] = getattr(instance, child_str)
     if not (child := manager.filter(user_id=user_id).first()):
         return
-    child.delete()
-    weights = get_weights(instance)
-    push_recommended_list.delay(instance_id, -weights)
+    with transaction.atomic():
+        child.delete()
+        increase_child_counter(Model, instance_id, child_str, -1)
+    # 생성 당시의 버킷에서 빼야 감쇠된 점수와 맞음
+    created_at: datetime = child.created_at  # type:ignore
+    push_recommended_list.delay(
+        instance_id, -get_weights(child_str), created_at.isoformat()
+    )
 
 
 @shared_task()
-def push_recommended_list(post_id: int, weights):
-    with TimeoutCache("post_recommended/v2") as cache:
-        cache.add(post_id)
+def push_recommended_list(post_id: int, weights: int, created_at: str | None = None):
+    with get_recommended_cache() as cache:
+        cache.add(
+            post_id,
+            weights=weights,
+            created_at=datetime.fromisoformat(created_at) if created_at else None,
+        )
 
 
 @shared_task()
@@ -89,7 +114,54 @@ def create_mentions_in_background(mentioned_to_id: int, post_id: int):
     Mention.objects.create(mentioned_to_id=mentioned_to_id, post_id=post_id)
 
 
+@shared_task()
+def fan_out_repost_to_timelines(repost_id: int):
+    from .models import Repost
+    from .services.timeline_service import HomeTimelineService
+
+    if not (repost := Repost.objects.filter(pk=repost_id).first()):
+        return
+    HomeTimelineService.fan_out_repost(repost)
+
+
+@shared_task()
+def backfill_home_timeline(user_id: int, target_user_id: int):
+    from users.models import User
+    from .services.timeline_service import HomeTimelineService
+
+    if not (user := User.objects.filter(pk=user_id).first()):
+        return
+    HomeTimelineService(user).backfill(target_user_id)
+
+
+@shared_task()
+def remove_from_home_timeline(user_id: int, target_user_id: int):
+    from users.models import User
+    from .services.timeline_service import HomeTimelineService
+
+    if not (user := User.objects.filter(pk=user_id).first()):
+        return
+    HomeTimelineService(user).remove(target_user_id)
+
+
+@shared_task()
+def trim_home_timelines():
+    from .services.timeline_service import HomeTimelineService
+
+    HomeTimelineService.trim()
+
+
+@shared_task()
+def flush_view_buffer():
+    from .services.view_buffer_service import ViewBufferService
+
+    if not (created := ViewBufferService.flush()):
+        return
+    with get_recommended_cache() as cache:
+        cache.add(*[view.post_id for view in created], weights=get_weights("views"))
+
+
 @shared_task()
 def expire_post_recommended():
-    with TimeoutCache("post_recommended/v2") as cache:
+    with get_recommended_cache() as cache:
         cache.remove_out_dated(localtime() - timedelta(days=1))
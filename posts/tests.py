@@ -1,19 +1,31 @@
 import base64
-from datetime import timedelta
+from datetime import datetime, timedelta
 
 from django.conf import settings
 from django.core.cache import cache
 from django.utils.timezone import localtime
 
 from base.test import TestCase
-from commons.caches import LRUCache, TimeoutCache
+from commons.caches import LRUCache, TimeoutCache, TrendingCache
+from commons.lock import get_redis
 
 from users.models import User
 
 from .services.recommend_service import RecommendService
 from .text_builder.block_text_builder import BlockTextBuilder
 from relations.service import FollowService
-from .models import Post, Favorite, Bookmark, Repost, View, models
+from .models import (
+    Post,
+    PostCounter,
+    TimelineEntry,
+    Favorite,
+    Bookmark,
+    Repost,
+    View,
+    models,
+)
+from .services.timeline_service import HomeTimelineService
+from .services.view_buffer_service import ViewBufferService
 from .serializers import (
     PostSerializer,
     FavoriteSerializer,
@@ -106,7 +118,8 @@ class TestPosts(TestCase):
         self.assertEqual(resp.status_code, 201)
 
         self.client.login(self.user)
-        resp = self.client.post(f"/relations/{self.user3.pk}/follow/")
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(f"/relations/{self.user3.pk}/follow/")
         self.assertEqual(resp.status_code, 201)
         settings.DEBUG = True
         # 리포스트 된 게시글은 리포스트 된글의 시점에따라 상단으로 올라오도록 함
@@ -129,6 +142,19 @@ class TestPosts(TestCase):
         resp = self.client.post(f"/posts/{post_id}/reposts/")
         self.assertEqual(resp.status_code, 201)
         resp = self.client.get(f"/posts/{post_id}/")
+        self.assertEqual(resp.json()["relavant_repost"]["id"], self.user.pk)
+        repost = Repost.objects.get(post_id=post_id, user=self.user)
+        self.assertEqual(
+            datetime.fromisoformat(resp.json()["latest_date"]), repost.created_at
+        )
+
+        # 팔로우하지 않은 유저의 리포스트는 노출되지 않음
+        self.client.login(self.user2)
+        resp = self.client.get(f"/posts/{post_id}/")
+        self.assertEqual(resp.json()["relavant_repost"], None)
+        FollowService(self.user2).follow(self.user)
+        resp = self.client.get(f"/posts/{post_id}/")
+        self.assertEqual(resp.json()["relavant_repost"]["id"], self.user.pk)
 
     def test_image(self):
         with open("./commons/cat.jpg", "rb") as clipped_file:
@@ -223,6 +249,12 @@ class TestPosts(TestCase):
         resp = self.client.get(f"/posts/{post_id}/replies/")
         self.assertEqual(resp.status_code, 200)
 
+        # 삭제된 답글은 부모 게시글의 답글 수에서 빠짐
+        resp = self.client.delete(f"/posts/{post3_id}/")
+        self.assertEqual(resp.status_code, 204)
+        resp = self.client.get(f"/posts/{post2_id}/")
+        self.assertEqual(resp.json()["replies_count"], 0)
+
     def test_quote(self):
         builder = BlockTextBuilder().text(value="hello")
         self.client.login(self.user)
@@ -248,11 +280,17 @@ class TestPosts(TestCase):
         )
         self.assertEqual(resp.status_code, 201)
         self.assertEqual(resp.json().get("quote"), post_id)
+        quote_id = resp.json()["id"]
 
         resp = self.client.get(f"/posts/{post_id}/")
         self.assertEqual(resp.json().get("quotes_count"), 1)
         self.assertEqual(resp.json().get("has_quote"), True)
 
+        resp = self.client.delete(f"/posts/{quote_id}/")
+        self.assertEqual(resp.status_code, 204)
+        resp = self.client.get(f"/posts/{post_id}/")
+        self.assertEqual(resp.json().get("quotes_count"), 0)
+
 
 class TestPostsBase(TestCase):
     user: User
@@ -339,17 +377,47 @@ class TestMention(TestCase):
 
 
 class TestView(TestPostsBase):
+    def setUp(self):
+        super().setUp()
+        with get_redis() as client:
+            client.delete(ViewBufferService.key)
+
     def test_view_create(self):
+        from .tasks import flush_view_buffer
+
         self.client.login(self.user)
         resp = self.client.get("/posts/timeline/followings/")
         self.assertEqual(resp.json()["results"][0]["has_view"], False)
         self.assertEqual(resp.json()["results"][0]["views_count"], 0)
         resp = self.client.post(f"/posts/{self.post_id}/views/")
         self.assertEqual(resp.json()["is_success"], True)
+        flush_view_buffer()
         resp = self.client.get("/posts/timeline/followings/")
         self.assertEqual(resp.json()["results"][0]["has_view"], True)
         self.assertEqual(resp.json()["results"][0]["views_count"], 1)
 
+    def test_flush_dedupe(self):
+        for user in [self.user, self.user, self.user2, self.user]:
+            ViewBufferService.push(self.post_id, user.pk)
+        ViewBufferService.push(self.post_id, 0)  # 존재하지 않는 유저
+        ViewBufferService.push("wrong", self.user.pk)
+
+        created = ViewBufferService.flush(batch_size=2)
+        self.assertEqual(len(created), 2)
+        self.assertEqual(View.objects.filter(post_id=self.post_id).count(), 2)
+        # 이미 저장된 조회는 다시 저장되거나 카운트되지 않음
+        ViewBufferService.push(self.post_id, self.user.pk)
+        self.assertEqual(ViewBufferService.flush(), [])
+        post = Post.concrete_queryset().get(pk=self.post_id)
+        self.assertEqual(post.views_count, 2)
+
+    def test_insert_returns_only_inserted(self):
+        # 같은 조회를 꺼낸 두 flush가 모두 already 확인을 통과해도 한번만 저장됨
+        pairs = {(self.post_id, self.user.pk)}
+        self.assertEqual(len(ViewBufferService.insert(pairs)), 1)
+        self.assertEqual(ViewBufferService.insert(pairs), [])
+        self.assertEqual(View.objects.filter(post_id=self.post_id).count(), 1)
+
 
 class TestProtected(TestPostsBase):
     def test_cannot_see_protected_users(self):
@@ -366,8 +434,9 @@ class TestProtected(TestPostsBase):
         resp = self.client.get(f"/posts/{self.post_id}/")
         self.assertEqual(resp.status_code, 404)
 
-        FollowService(self.user).follow(self.user2)
-        FollowService(self.user2).follow(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user).follow(self.user2)
+            FollowService(self.user2).follow(self.user)
 
         self.client.login(self.user2)
         resp = self.client.get(f"/posts/{self.post_id}/")
@@ -387,6 +456,37 @@ class TestProtected(TestPostsBase):
         resp = self.client.get(f"/posts/timeline/username/{self.user.username}/")
         self.assertEqual(resp.json()["results"].__len__(), 0)
 
+    def test_protected_mutual_index(self):
+        from relations.service import ProtectedMutualIndex
+
+        # 인덱스는 팔로우/설정 변경이 커밋된 다음에 갱신됨
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user).follow(self.user2)
+            FollowService(self.user2).follow(self.user)
+        self.assertEqual(ProtectedMutualIndex.get(self.user2.pk), set())
+
+        # 보호계정 설정이 바뀌면 서로 팔로우중인 유저들의 목록에 반영
+        with self.captureOnCommitCallbacks(execute=True):
+            self.user.is_protected = True
+            self.user.save()
+        self.assertEqual(ProtectedMutualIndex.get(self.user2.pk), {self.user.pk})
+
+        # is_protected가 바뀌지 않은 저장은 인덱스를 다시 계산하지 않음
+        with self.captureOnCommitCallbacks() as callbacks:
+            self.user.save()
+            User.objects.get(pk=self.user.pk).save()
+        self.assertEqual(callbacks, [])
+
+        self.client.login(self.user2)
+        resp = self.client.get(f"/posts/{self.post_id}/")
+        self.assertEqual(resp.status_code, 200)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user2).unfollow(self.user)
+        self.assertEqual(ProtectedMutualIndex.get(self.user2.pk), set())
+        resp = self.client.get(f"/posts/{self.post_id}/")
+        self.assertEqual(resp.status_code, 404)
+
 
 class TestDeletedPost(TestPostsBase):
     def test_delete_post(self):
@@ -453,7 +553,7 @@ class TestRecommended(TestPostsBase):
         posts = [Post(user=self.user, text=f"{i}") for i in range(100)]
         posts = Post.objects.bulk_create(posts)
         cache.delete(f"cached_sessions/v2:{self.user.pk}")
-        with TimeoutCache("post_recommended/v2") as tc:
+        with TrendingCache("post_recommended/v3") as tc:
             tc.trunc()
             tc.add(self.post_id, weights=2)
             tc.add(post_2)
@@ -470,6 +570,61 @@ class TestRecommended(TestPostsBase):
         )
         self.pprint(resp.json())
 
+    def test_weights(self):
+        from .tasks import (
+            create_child_model,
+            delete_child_models,
+            get_recommended_cache,
+        )
+
+        post_2 = self.create_post(self.user2)
+        with get_recommended_cache() as tc:
+            tc.trunc()
+        create_child_model("posts.Post", "bookmarks", self.post_id, self.user2.pk)
+        create_child_model("posts.Post", "reposts", post_2, self.user.pk)
+        with get_recommended_cache() as tc:
+            tc.merge()
+            self.assertEqual(tc.counter(), [post_2, self.post_id])
+
+        # 취소된 상호작용의 가중치는 다시 빠짐
+        delete_child_models("posts.Post", "reposts", post_2, self.user.pk)
+        with get_recommended_cache() as tc:
+            tc.merge()
+            self.assertEqual(tc.counter(), [self.post_id])
+
+        cache.delete(f"cached_sessions/v2:{self.user.pk}")
+        self.client.login(self.user)
+        resp = self.client.get("/posts/timeline/global/", dict(session_min_size=0))
+        self.assertEqual(resp.json()["results"][0]["id"], self.post_id)
+
+    def test_session_pagination(self):
+        posts = Post.objects.bulk_create(
+            [Post(user=self.user, text=f"{i}") for i in range(25)]
+        )
+        cache.delete(f"cached_sessions/v2:{self.user.pk}")
+        with TrendingCache("post_recommended/v3") as tc:
+            tc.trunc()
+            for weights, post in enumerate(posts, start=1):
+                tc.add(post.pk, weights=weights)
+            ranked = tc.counter()
+        self.assertEqual(ranked[0], posts[-1].pk)
+
+        self.client.login(self.user)
+        params = dict(session_min_size=0, page_size=10)
+        resp = self.client.get("/posts/timeline/global/", params)
+        self.assertEqual([post["id"] for post in resp.json()["results"]], ranked[:10])
+        self.assertEqual(resp.json()["current_offset"], 0)
+        self.assertEqual(resp.json()["next_offset"], 10)
+
+        resp = self.client.get("/posts/timeline/global/", dict(params, offset=20))
+        self.assertEqual([post["id"] for post in resp.json()["results"]], ranked[20:])
+        self.assertEqual(resp.json()["next_offset"], None)
+
+        resp = self.client.get(
+            "/posts/timeline/global/", dict(params, offset=10, direction="prev")
+        )
+        self.assertEqual([post["id"] for post in resp.json()["results"]], ranked[:10])
+
     def test_exceed_cache(self):
         print("run")
         from django.utils.timezone import localtime
@@ -480,7 +635,7 @@ class TestRecommended(TestPostsBase):
         posts = Post.objects.bulk_create(posts)
         print("post create")
         cache.delete(f"cached_sessions/v2:{self.user.pk}")
-        with TimeoutCache("post_recommended/v2") as tc:
+        with TrendingCache("post_recommended/v3") as tc:
             tc.trunc()
             tc.add(self.post_id, weights=2, created_at=localtime() - timedelta(hours=1))
             tc.add(post_2, created_at=localtime() - timedelta(hours=1))
@@ -498,6 +653,298 @@ class TestRecommended(TestPostsBase):
             self.assertEqual(tc.counter().__len__(), 100)
 
 
+class TestPostCounter(TestCase):
+    def get_post(self, post_id: int):
+        return Post.concrete_queryset().get(pk=post_id)
+
+    def test_child_counter(self):
+        from .tasks import create_child_model, delete_child_models
+
+        (post,) = Post.objects.bulk_create([Post(user=self.user, text="hello")])
+        self.assertEqual(self.get_post(post.pk).favorites_count, 0)
+
+        create_child_model("posts.Post", "favorites", post.pk, self.user2.pk)
+        create_child_model("posts.Post", "favorites", post.pk, self.user2.pk)
+        create_child_model("posts.Post", "reposts", post.pk, self.user3.pk)
+        post = self.get_post(post.pk)
+        self.assertEqual(post.favorites_count, 1)
+        self.assertEqual(post.reposts_count, 1)
+
+        delete_child_models("posts.Post", "favorites", post.pk, self.user2.pk)
+        self.assertEqual(self.get_post(post.pk).favorites_count, 0)
+
+    def test_reconcile(self):
+        post, reply = Post.objects.bulk_create(
+            [Post(user=self.user, text="post"), Post(user=self.user2, text="reply")]
+        )
+        Post.objects.filter(pk=reply.pk).update(parent=post)
+        View.objects.create(post=post, user=self.user2)
+        self.assertEqual(self.get_post(post.pk).views_count, 0)
+
+        # bulk_create로 만든 게시글은 카운터 행이 없으므로 둘다 수정됨
+        fixed = PostCounter.reconcile(Post.objects.filter(pk__in=[post.pk, reply.pk]))
+        self.assertEqual(fixed, 2)
+        post = self.get_post(post.pk)
+        self.assertEqual(post.views_count, 1)
+        self.assertEqual(post.replies_count, 1)
+        self.assertEqual(PostCounter.reconcile(Post.objects.filter(pk=post.pk)), 0)
+
+
+class TestHomeTimeline(TestPostsBase):
+    def setUp(self):
+        super().setUp()
+        with get_redis() as client:
+            client.delete(HomeTimelineService.fan_out_on_read_key)
+
+    def get_timeline_ids(self, user: User):
+        self.client.login(user)
+        resp = self.client.get("/posts/timeline/followings/")
+        self.assertEqual(resp.status_code, 200)
+        return [post["id"] for post in resp.json()["results"]]
+
+    def test_fan_out_on_write(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user2).follow(self.user)
+        # 팔로우시 기존 게시글이 채워짐
+        self.assertIn(self.post_id, self.get_timeline_ids(self.user2))
+
+        post_id = self.create_post(self.user)
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.user2, post_id=post_id).exists(),
+            True,
+        )
+        self.assertEqual(self.get_timeline_ids(self.user2)[0], post_id)
+        self.assertNotIn(post_id, self.get_timeline_ids(self.user3))
+
+        # 리포스트는 리포스트한 유저의 팔로워에게 기록됨
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user3).follow(self.user2)
+        self.client.login(self.user2)
+        self.client.post(f"/posts/{self.post_id}/reposts/")
+        self.assertEqual(self.get_timeline_ids(self.user3)[0], self.post_id)
+
+        # 언팔로우가 커밋된 이후에 제거됨
+        with self.captureOnCommitCallbacks() as callbacks:
+            FollowService(self.user2).unfollow(self.user)
+        self.assertEqual(TimelineEntry.objects.filter(post_id=post_id).exists(), True)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(TimelineEntry.objects.filter(post_id=post_id).exists(), False)
+        self.assertNotIn(post_id, self.get_timeline_ids(self.user2))
+
+    def test_remove_keeps_reposted(self):
+        FollowService(self.user3).follow(self.user)
+        FollowService(self.user3).follow(self.user2)
+        post_id = self.create_post(self.user)
+        other_id = self.create_post(self.user2)
+        # 여전히 팔로우중인 user2가 리포스트한 user의 게시글
+        self.client.login(self.user2)
+        self.client.post(f"/posts/{self.post_id}/reposts/")
+        # user3 자신이 리포스트한 user의 게시글
+        self.client.login(self.user3)
+        self.client.post(f"/posts/{post_id}/reposts/")
+        # user가 리포스트한 user2의 게시글은 user2를 팔로우중이라 남음
+        self.client.login(self.user)
+        self.client.post(f"/posts/{other_id}/reposts/")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user3).unfollow(self.user)
+        timeline_ids = set(
+            TimelineEntry.objects.filter(user=self.user3).values_list(
+                "post_id", flat=True
+            )
+        )
+        self.assertEqual(timeline_ids, {self.post_id, post_id, other_id})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user3).unfollow(self.user2)
+        timeline_ids = set(
+            TimelineEntry.objects.filter(user=self.user3).values_list(
+                "post_id", flat=True
+            )
+        )
+        self.assertEqual(timeline_ids, {post_id})
+
+    def test_timeline_pages(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user2).follow(self.user)
+        post_ids = [self.post_id]
+        for _ in range(3):
+            post_ids.append(self.create_post(self.user))
+            post_ids.append(self.create_post(self.user2))
+        # 자신이 리포스트한 게시글은 리포스트한 시점으로 올라옴
+        self.client.login(self.user2)
+        self.client.post(f"/posts/{self.post_id}/reposts/")
+        expected = [self.post_id, *reversed(post_ids[1:])]
+
+        ids = []
+        offset = None
+        while True:
+            params = dict(page_size=3, **(dict(offset=offset) if offset else {}))
+            resp = self.client.get("/posts/timeline/followings/", params)
+            self.assertEqual(resp.status_code, 200)
+            self.assertLessEqual(len(resp.json()["results"]), 3)
+            ids += [post["id"] for post in resp.json()["results"]]
+            if not (offset := resp.json()["next_offset"]):
+                break
+        self.assertEqual(ids, expected)
+
+    def test_fan_out_on_read(self):
+        FollowService(self.user2).follow(self.user)
+        with self.settings(HOME_TIMELINE_FAN_OUT_MAX_FOLLOWERS=0):
+            post_id = self.create_post(self.user)
+        self.assertEqual(TimelineEntry.objects.filter(post_id=post_id).exists(), False)
+        self.assertEqual(self.get_timeline_ids(self.user2)[0], post_id)
+        self.assertNotIn(post_id, self.get_timeline_ids(self.user3))
+
+    def test_trim(self):
+        posts = Post.objects.bulk_create(
+            [Post(user=self.user2, text=str(i)) for i in range(3)]
+        )
+        for post in posts:
+            HomeTimelineService.push([self.user3.pk], post.pk, post.created_at)
+        HomeTimelineService.trim(max_entries=2)
+        self.assertEqual(
+            list(
+                TimelineEntry.objects.filter(user=self.user3)
+                .order_by("-latest_date")
+                .values_list("post_id", flat=True)
+            ),
+            [posts[2].pk, posts[1].pk],
+        )
+
+
+class TestReplyRowNumber(TestPostsBase):
+    def get_row_numbers(self, *post_ids: int):
+        return [Post.objects.get(pk=pk).reply_row_number_desc for pk in post_ids]
+
+    def test_reply_row_number(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        reply_kwargs = dict(parent=self.post_id, origin=self.post_id)
+        with CaptureQueriesContext(connection) as queries:
+            first = self.create_post(self.user2, **reply_kwargs)
+        # 번호를 미는 동안 origin 행을 잠금
+        self.assertTrue(any("FOR UPDATE" in query["sql"] for query in queries))
+        second = self.create_post(self.user2, **reply_kwargs)
+        other = self.create_post(self.user3, **reply_kwargs)
+        self.assertEqual(self.get_row_numbers(self.post_id), [0])
+        self.assertEqual(self.get_row_numbers(second, first, other), [1, 2, 1])
+
+        self.client.login(self.user2)
+        resp = self.client.get(f"/posts/{self.post_id}/replies/")
+        row_numbers = {
+            post["id"]: post["reply_row_number_desc"] for post in resp.json()["results"]
+        }
+        self.assertEqual(row_numbers[first], 2)
+
+        resp = self.client.delete(f"/posts/{second}/")
+        self.assertEqual(resp.status_code, 204)
+        self.assertEqual(self.get_row_numbers(first), [1])
+
+        Post.objects.filter(pk=first).update(reply_row_number_desc=5)
+        self.assertEqual(Post.rebuild_reply_row_numbers([self.post_id]), 1)
+        self.assertEqual(self.get_row_numbers(first), [1])
+
+
+class TestAnonymousPageCache(TestPostsBase):
+    def get_ids(self, url: str):
+        resp = self.client.get(url)
+        self.assertEqual(resp.status_code, 200)
+        return [post["id"] for post in resp.json()["results"]]
+
+    def logout(self):
+        self.client._headers = dict()
+
+    def test_user_timeline(self):
+        self.logout()
+        url = f"/posts/timeline/username/{self.user.username}/"
+        self.assertEqual(self.get_ids(url), [self.post_id])
+        # 시그널 없이 생성된 게시글은 캐시된 페이지에 보이지 않음
+        Post.objects.bulk_create([Post(user=self.user, text="bulk")])
+        self.assertEqual(self.get_ids(url), [self.post_id])
+
+        post_id = self.create_post(self.user)
+        self.assertEqual(self.get_ids(url)[0], post_id)
+
+        # 로그인 유저는 캐시를 사용하지 않음
+        self.client.login(self.user)
+        self.assertEqual(len(self.get_ids(url)), 3)
+
+        self.client.delete(f"/posts/{post_id}/")
+        self.logout()
+        self.assertNotIn(post_id, self.get_ids(url))
+
+
+class TestPostFragmentCache(TestPostsBase):
+    def test_fragment(self):
+        from .tasks import create_child_model
+
+        self.client.login(self.user)
+        url = f"/posts/timeline/username/{self.user.username}/"
+        first = self.client.get(url).json()["results"]
+        self.assertEqual(self.client.get(url).json()["results"], first)
+        self.assertEqual(self.client.get(f"/posts/{self.post_id}/").json(), first[0])
+
+        # updated_at이 바뀌지 않은 변경은 캐시된 조각이 사용됨
+        Post.objects.filter(pk=self.post_id).update(text="changed")
+        self.assertEqual(
+            self.client.get(url).json()["results"][0]["text"], "hello world"
+        )
+
+        # 요청유저 기준의 값과 카운트는 캐시된 조각 위에 덮어씌워짐
+        create_child_model("posts.Post", "favorites", self.post_id, self.user2.pk)
+        FollowService(self.user2).follow(self.user)
+        self.client.login(self.user2)
+        post = self.client.get(url).json()["results"][0]
+        self.assertEqual(post["has_favorite"], True)
+        self.assertEqual(post["favorites_count"], 1)
+        self.assertEqual(post["user"]["is_following_to"], True)
+        self.assertEqual(post["user"]["followers_count"], 1)
+
+        # 작성자의 프로필 변경은 게시글이 수정되지 않아도 바로 반영됨
+        User.objects.filter(pk=self.user.pk).update(nickname="renamed")
+        post = self.client.get(url).json()["results"][0]
+        self.assertEqual(post["user"]["nickname"], "renamed")
+        self.assertEqual(post["text"], "hello world")
+
+        instance = Post.objects.get(pk=self.post_id)
+        instance.save()
+        self.assertEqual(self.client.get(url).json()["results"][0]["text"], "changed")
+
+
+class TestViewerFlag(TestPostsBase):
+    def test_hydrate(self):
+        from .services.viewer_flag_service import ViewerFlagService
+
+        posts = Post.objects.bulk_create(
+            [Post(user=self.user2, text=str(i)) for i in range(5)]
+        )
+        Favorite.objects.create(post=posts[0], user=self.user)
+        Bookmark.objects.create(post=posts[1], user=self.user)
+        FollowService(self.user).follow(self.user2)
+
+        posts = list(Post.concrete_queryset(self.user).filter(user=self.user2))
+        # 처음에는 요청유저의 팔로잉/팔로워 목록을 Redis에 채우는 쿼리가 두번 더 실행됨
+        with self.assertNumQueries(7):
+            ViewerFlagService(self.user).hydrate(posts)
+        # 게시글 수와 상관없이 관계마다 한번씩만 조회, 팔로우 관계는 Redis에서 확인
+        with self.assertNumQueries(5):
+            ViewerFlagService(self.user).hydrate(posts)
+        self.assertEqual([post.has_favorite for post in posts].count(True), 1)
+        self.assertEqual([post.has_bookmark for post in posts].count(True), 1)
+        self.assertEqual(all(post.is_user_following_post_user for post in posts), True)
+        self.assertEqual(
+            any(post.is_post_user_following_request_user for post in posts), False
+        )
+        self.assertEqual(all(post.user.is_following_to for post in posts), True)
+        self.assertEqual(any(post.user.is_mutual_follow for post in posts), False)
+
+        ViewerFlagService(None).hydrate(posts)
+        self.assertEqual(any(post.has_favorite for post in posts), False)
+
+
 class TestElasticSearch(TestCase):
     def test_es(self):
         resp = self.client.get("/posts/timeline/search/", dict(search="#TeslaStock"))
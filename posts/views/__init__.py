@@ -7,7 +7,6 @@ from rest_framework import serializers
 
 from commons import paginations
 from commons import permissions
-from commons.caches import TimeoutCache
 from commons.requests import Request
 from commons.utils.get_client_ip import get_client_ip
 from commons.viewsets import BaseViewset
@@ -16,9 +15,14 @@ from images.models import Image
 from images.serializers import ImageSerializer
 from users.models import User, models
 from relations.models import Follow
+from relations.service import ProtectedMutualIndex
 from ..services.recommend_service import RecommendService
-from ..models import Post
+from ..services.page_cache_service import AnonymousPageCacheService
+from ..services.timeline_service import HomeTimelineService
+from ..services.view_buffer_service import ViewBufferService
+from ..models import Post, PostCounter
 from ..serializers import PostSerializer, FavoriteSerializer, PostReadOnlySerializer
+from ..tasks import get_recommended_cache, get_weights, push_recommended_list
 
 from .child_views import create_bool_child_mixin
 
@@ -32,25 +36,26 @@ class SessionSizeSerializer(serializers.Serializer):
 @create_bool_child_mixin[Post](
     model_path="posts.Post",
     url_path="views",
-    override_get_qs=lambda vs, qs: qs.filter(has_view=True),
+    override_get_qs=lambda vs, qs: qs.filter(Post.get_has_view(vs.request.user)),
     child_str="views",
+    create_child=ViewBufferService.push,
 )
 @create_bool_child_mixin[Post](
     model_path="posts.Post",
     url_path="reposts",
-    override_get_qs=lambda vs, qs: qs.filter(has_repost=True),
+    override_get_qs=lambda vs, qs: qs.filter(Post.get_has_repost(vs.request.user)),
     child_str="reposts",
 )
 @create_bool_child_mixin[Post](
     model_path="posts.Post",
     url_path="bookmarks",
-    override_get_qs=lambda vs, qs: qs.filter(has_bookmark=True),
+    override_get_qs=lambda vs, qs: qs.filter(Post.get_has_bookmark(vs.request.user)),
     child_str="bookmarks",
 )
 @create_bool_child_mixin[Post](
     model_path="posts.Post",
     url_path="favorites",
-    override_get_qs=lambda vs, qs: qs.filter(has_favorite=True),
+    override_get_qs=lambda vs, qs: qs.filter(Post.get_has_favorite(vs.request.user)),
     child_str="favorites",
 )
 class PostViewSet(BaseViewset[Post, User]):
@@ -77,26 +82,14 @@ class PostViewSet(BaseViewset[Post, User]):
         return user
 
     def get_custom_filterset(self, queryset: models.QuerySet[Post]):
-        qs = queryset.annotate(is_user_protected=models.F("user__is_protected"))
+        # 보호계정의 게시글은 본인과 서로 팔로우중인 유저에게만 노출
+        visible = models.Q(user__is_protected=False)
         if not self.request.user.is_authenticated:
-            return qs.filter(models.Q(is_user_protected=False))
-        # post__user가 request.user를 팔로우중인지 알아야됨
-        # Follow의 followed_by=post__user와 following_to=request.user를 사용
-        return qs.filter(
-            models.Q(is_user_protected=False)  # 모든 유저
-            | models.Q(
-                models.Q(is_user_protected=True)
-                & models.Q(
-                    models.Q(
-                        user=self.request.user
-                    )  # 프로텍트 되어있지만 나의 글인경우
-                    | models.Q(
-                        is_post_user_following_request_user=True,
-                        is_user_following_post_user=True,
-                    )  # 서로 팔로우 하는 경우
-                )
-            )
-        )
+            return queryset.filter(visible)
+        visible |= models.Q(user=self.request.user)
+        if protected_ids := ProtectedMutualIndex.get(self.request.user.pk):
+            visible |= models.Q(user__in=protected_ids)
+        return queryset.filter(visible)
 
     def list(self, request, *args, **kwargs):
         self.override_get_queryset(lambda qs: qs.filter(deleted_at__isnull=True))
@@ -161,11 +154,16 @@ class PostViewSet(BaseViewset[Post, User]):
     )
     def get_user_timeline(self, *args, **kwargs):
         user = self.get_user_from_queries()
+        page_cache = AnonymousPageCacheService(
+            self.request, f"username/{user.pk}", user.pk
+        )
+        if (data := page_cache.get()) != None:
+            return self.Response(data)
         self.get_queryset = lambda: Post.concrete_queryset(self.request.user, user)
         self.override_get_queryset(
             lambda qs: qs.filter(models.Q(user=user) | models.Q(reposts__user=user))
         )
-        return self.list(*args, **kwargs)
+        return self.list_with_page_cache(page_cache, *args, **kwargs)
 
     @action(
         methods=["GET"],
@@ -218,16 +216,19 @@ class PostViewSet(BaseViewset[Post, User]):
         permission_classes=[permissions.AuthorizedOnly],
     )
     def get_timeline(self, *args, **kwargs):
-        self.override_get_queryset(
-            lambda qs: qs.filter(
-                models.Q(is_post_user_following_request_user=True)
-                | models.Q(user=self.request.user)
-                | models.Q(has_repost=True)
-            )
-        )
-
+        # 타임라인의 게시글 id를 먼저 페이지 단위로 구한 뒤 해당 게시글만 조회
+        self.pagination_class = paginations.EntryPagination
+        self.get_entries = HomeTimelineService(self.request.user).get_entries
         return self.list(*args, **kwargs)
 
+    def list_with_page_cache(
+        self, page_cache: AnonymousPageCacheService, *args, **kwargs
+    ):
+        resp = self.list(*args, **kwargs)
+        if resp.status_code == 200:
+            page_cache.set(resp.data)
+        return resp
+
     def get_session_key(self):
         key = f"cached_sessions/v2:{get_client_ip(self.request)}"
         if self.request.user.is_authenticated:
@@ -243,23 +244,23 @@ class PostViewSet(BaseViewset[Post, User]):
             s.is_valid(raise_exception=True),
             s.data["session_min_size"],  # type:ignore
         )
+        page_cache = AnonymousPageCacheService(self.request, "global")
+        if (data := page_cache.get()) != None:
+            return self.Response(data)
         self.offset_field = "id"
         key = self.get_session_key()
         saved_session: list[int] | None = cache.get(key)
         if not saved_session:
-            with TimeoutCache("post_recommended/v2") as pcache:
+            with get_recommended_cache() as pcache:
                 saved_session = pcache.counter()
                 if len(saved_session) < session_min_size:
-                    return self.list(*args, **kwargs)
+                    return self.list_with_page_cache(page_cache, *args, **kwargs)
 
                 cache.set(key, saved_session, timeout=300)
-        preserved = models.Case(
-            *[models.When(pk=pk, then=pos) for pos, pk in enumerate(saved_session)]
-        )
-        self.override_get_queryset(
-            lambda qs: qs.filter(id__in=saved_session).order_by(preserved)
-        )
-        return self.list(*args, **kwargs)
+        # 세션의 순서대로 페이지에 해당하는 id들만 잘라서 조회
+        self.pagination_class = paginations.SessionPagination
+        self.session = saved_session
+        return self.list_with_page_cache(page_cache, *args, **kwargs)
 
     @action(methods=["GET"], detail=True, url_path="replies")
     def get_replies(self, *args, **kwargs):
@@ -269,5 +270,21 @@ class PostViewSet(BaseViewset[Post, User]):
         return self.list(*args, **kwargs)
 
     def perform_destroy(self, instance):
+        if instance.deleted_at:
+            return
         instance.deleted_at = localtime()
         instance.save()
+        # 삭제된 답글과 인용은 부모/인용된 게시글의 집계에서 빠짐
+        deltas: dict[int, dict[str, int]] = {}
+        if instance.parent_id:
+            deltas.setdefault(instance.parent_id, {})["replies_count"] = -1
+        if instance.quote_id:
+            deltas.setdefault(instance.quote_id, {})["quotes_count"] = -1
+        PostCounter.increase_many(deltas)
+        Post.pull_reply_row_number(instance)
+        if instance.parent_id:
+            push_recommended_list.delay(
+                instance.parent_id,
+                -get_weights("replies"),
+                instance.created_at.isoformat(),
+            )
@@ -1,4 +1,4 @@
-from typing import Callable, Generic, Self, TypeVar
+from typing import Any, Callable, Generic, Self, TypeVar
 from django.apps import apps
 
 from rest_framework import exceptions
@@ -33,6 +33,7 @@ class create_bool_child_mixin(Generic[M]):
             [BaseViewset[M, User], models.QuerySet[M]], models.QuerySet[M]
         ],
         child_str: str,
+        create_child: Callable[[int, int], Any] | None = None,
     ):
         self.model_path = model_path
         self.url_path, self.override_get_qs, self.child_str = (
@@ -40,6 +41,8 @@ class create_bool_child_mixin(Generic[M]):
             override_get_qs,
             child_str,
         )
+        # (instance_id, user_id)를 받아 생성을 대신 처리, 없으면 create_child_model 태스크를 사용
+        self.create_child = create_child
 
     def __call__(self, kls: type[BaseViewset[M, User]]) -> type[BaseViewset[M, User]]:
         def get_instance_id(inner: BaseViewset):
@@ -67,6 +70,11 @@ class create_bool_child_mixin(Generic[M]):
             @staticmethod
             def _create_items():
                 def create_items(inner: Self, *args, **kwargs):
+                    if self.create_child:
+                        self.create_child(
+                            get_instance_id(inner), inner.request.user.pk
+                        )
+                        return inner.result_response(True)
                     create_child_model.delay(
                         self.model_path,
                         self.child_str,
@@ -6,6 +6,19 @@ class RelationsConfig(AppConfig):
     name = "relations"
 
     def ready(self) -> None:
-        from .signals import on_following_created
+        from .signals import (
+            on_following_created,
+            on_follow_created_notified,
+            on_following_added_counted,
+            on_follow_created_counted,
+            on_follow_deleted_counted,
+            on_following_added_cached,
+            on_follow_created_cached,
+            on_follow_deleted_cached,
+            on_following_added_indexed,
+            on_follow_created_indexed,
+            on_follow_deleted_indexed,
+            on_user_protected_changed,
+        )
 
         return super().ready()
@@ -0,0 +1,54 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:31
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def remove_duplicated_follows(apps, schema_editor):
+    Follow = apps.get_model("relations", "Follow")
+    Notification = apps.get_model("notifications", "Notification")
+    UserCounter = apps.get_model("users", "UserCounter")
+    duplicateds = (
+        Follow.objects.order_by()
+        .values("followed_by", "following_to")
+        .annotate(first_id=models.Min("pk"), count=models.Count("pk"))
+        .filter(count__gt=1)
+    )
+    removed = False
+    for row in list(duplicateds):
+        follows = Follow.objects.filter(
+            followed_by=row["followed_by"], following_to=row["following_to"]
+        ).exclude(pk=row["first_id"])
+        # 중복 팔로우로 만들어진 알림도 같이 지움
+        Notification.objects.filter(followed_user__in=follows).delete()
+        follows.delete()
+        removed = True
+        UserCounter.objects.filter(user_id=row["followed_by"]).update(
+            followings_count=models.F("followings_count") - (row["count"] - 1)
+        )
+        UserCounter.objects.filter(user_id=row["following_to"]).update(
+            followers_count=models.F("followers_count") - (row["count"] - 1)
+        )
+    if removed and schema_editor.connection.vendor == "postgresql":
+        # Notification.followed_user가 Follow를 참조하므로 삭제하면 지연된 FK 트리거가 남고,
+        # 같은 트랜잭션의 AddConstraint가 pending trigger events로 실패함, 여기서 미리 실행시킴
+        schema_editor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        schema_editor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('relations', '0002_follow_relations_f_followi_fbec60_idx_and_more'),
+        ('users', '0012_usercounter'),
+        ('notifications', '0002_alter_notification_followed_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicated_follows, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('followed_by', 'following_to'), name='unique_follow'),
+        ),
+    ]
@@ -11,6 +11,11 @@ class Follow(models.Model):
             models.Index(fields=["followed_by", "created_at"]),
             models.Index(fields=["following_to", "followed_by"]),
         ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["followed_by", "following_to"], name="unique_follow"
+            )
+        ]
 
     created_at = models.DateTimeField(auto_now_add=True)
     following_to = models.ForeignKey(
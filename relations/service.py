@@ -1,30 +1,95 @@
-from typing import Self
+from datetime import datetime, timezone
+from typing import Iterable, Self
+from django.conf import settings
+from django.contrib.auth.models import AbstractBaseUser
 from django.db.transaction import atomic
-from django.db import models
-from commons.lock import with_lock
+from django.db import IntegrityError, connection, models
+from django.db.models.signals import m2m_changed
+from django.utils.timezone import localtime
+from commons.lock import get_redis
 from users.models import User
 from .models import Follow
 
 
-def get_key(self: "FollowService", target_user: User):
-    return f"following:{self.user.pk}:{target_user.pk}"
-
-
 class FollowService:
+    """
+    팔로우/언팔로우는 락 없이 (followed_by, following_to) 유니크 제약에 맡기고 변경 여부를 반환
+    빠르게 여러번 눌러도 INSERT 하나만 성공하고, 나머지는 IntegrityError로 False가 됨
+    """
+
     def __init__(self, user: User):
         self.user = user
 
-    @with_lock(get_key)
-    def follow(self, target_user: User):
-        if not self.user.followings.filter(id=target_user.pk).exists():
-            self.user.followings.add(target_user)
+    def follow(self, target_user: User) -> bool:
+        try:
+            with atomic():
+                Follow.objects.create(followed_by=self.user, following_to=target_user)
+        except IntegrityError:
+            return False
+        return True
+
+    def follow_many(self, user_ids: Iterable[int]) -> list[int]:
+        """
+        여러 유저를 한번에 팔로우하고 새로 팔로우한 유저 id들을 반환
+        락 대신 (followed_by, following_to) 유니크 제약으로 중복을 막고,
+        m2m_changed(post_add)를 한번만 보내 알림/카운터/캐시를 배치 단위로 갱신
+        """
+        followings = Follow.objects.filter(followed_by=self.user).values("following_to")
+        targets = set(
+            User.objects.filter(pk__in=set(user_ids))
+            .exclude(pk=self.user.pk)
+            .exclude(pk__in=followings)
+            .values_list("pk", flat=True)
+        )
+        if not targets:
+            return []
+        with atomic():
+            # 확인 이후 다른 요청이 먼저 팔로우한 유저는 빼고 알림/카운터를 갱신
+            if not (inserted := self.insert(sorted(targets))):
+                return []
+            m2m_changed.send(
+                sender=Follow,
+                instance=self.user,
+                action="post_add",
+                reverse=False,
+                model=User,
+                pk_set=set(inserted),
+                using=Follow.objects.db,
+            )
+        return sorted(inserted)
+
+    def insert(self, user_ids: list[int]) -> list[int]:
+        """
+        bulk_create(ignore_conflicts=True)는 충돌로 건너뛴 행을 알려주지 않음
+        ON CONFLICT DO NOTHING RETURNING으로 실제로 팔로우된 유저 id만 돌려받음
+        """
+        quote = connection.ops.quote_name
+        columns = ", ".join(
+            quote(Follow._meta.get_field(name).column)
+            for name in ("followed_by", "following_to", "created_at")
+        )
+        now = localtime()
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"INSERT INTO {quote(Follow._meta.db_table)} ({columns}) "
+                f"VALUES {', '.join(['(%s, %s, %s)'] * len(user_ids))} "
+                "ON CONFLICT DO NOTHING RETURNING following_to_id",
+                [value for pk in user_ids for value in (self.user.pk, pk, now)],
+            )
+            return [pk for (pk,) in cursor.fetchall()]
+
+    def get_following_ids(self):
+        return list(
+            Follow.objects.filter(followed_by=self.user)
+            .order_by("created_at", "pk")
+            .values_list("following_to", flat=True)
+        )
 
-    @with_lock(get_key)
-    def unfollow(self, target_user: User):
-        if self.user.followings.filter(id=target_user.pk).exists():
-            Follow.objects.filter(
-                following_to=target_user, followed_by=self.user
-            ).delete()
+    def unfollow(self, target_user: User) -> bool:
+        _, deleted = Follow.objects.filter(
+            following_to=target_user, followed_by=self.user
+        ).delete()
+        return bool(deleted.get(Follow._meta.label, 0))
 
     def get_users_followers(self, user: User):
         return (
@@ -56,3 +121,304 @@ class FollowService:
         return User.concrete_queryset(self.user).filter(
             followers__followed_by_id=self.user, followings=self.user
         )
+
+
+class SocialGraphCache:
+    """
+    유저별 팔로잉/팔로워 목록을 Redis sorted set(member=유저 id, score=팔로우 시각)으로 캐시
+    1. 처음 조회될 때 Follow에서 한번에 읽어 채우고, 채워졌다는 표시로 loaded_member를 함께 넣음
+    2. 팔로우/언팔로우 시그널에서 ZADD/ZREM으로 갱신
+    3. 한 페이지의 유저들과의 관계는 ZMSCORE 두번을 파이프라인으로 묶어 한번에 확인
+    """
+
+    # {방향: (목록 주인의 Follow 필드, 목록에 담길 유저의 Follow 필드)}
+    directions = dict(
+        followings=("followed_by", "following_to"),
+        followers=("following_to", "followed_by"),
+    )
+    # 유저 id는 0이 될 수 없으므로 목록이 채워졌는지 표시하는 용도로 사용
+    loaded_member = 0
+
+    def __init__(self, user: AbstractBaseUser | None = None):
+        if user and not user.is_authenticated:
+            user = None
+        self.user = user
+
+    @classmethod
+    def get_key(cls, direction: str, user_id: int):
+        return f"social_graph/{direction}:{user_id}"
+
+    @classmethod
+    def add(cls, followed_by_id: int, following_at: dict[int, datetime]):
+        # 목록이 아직 채워지지 않았더라도 그대로 추가, loaded_member가 없으면 조회시 다시 채워짐
+        if not following_at:
+            return
+        timeout = settings.SOCIAL_GRAPH_CACHE_TIMEOUT
+        with get_redis() as client:
+            pipe = client.pipeline()
+            key = cls.get_key("followings", followed_by_id)
+            pipe.zadd(key, {pk: at.timestamp() for pk, at in following_at.items()})
+            pipe.expire(key, timeout)
+            for pk, at in following_at.items():
+                key = cls.get_key("followers", pk)
+                pipe.zadd(key, {followed_by_id: at.timestamp()})
+                pipe.expire(key, timeout)
+            pipe.execute()
+
+    @classmethod
+    def remove(cls, followed_by_id: int, following_to_ids: Iterable[int]):
+        following_to_ids = list(following_to_ids)
+        if not following_to_ids:
+            return
+        with get_redis() as client:
+            pipe = client.pipeline()
+            pipe.zrem(cls.get_key("followings", followed_by_id), *following_to_ids)
+            for pk in following_to_ids:
+                pipe.zrem(cls.get_key("followers", pk), followed_by_id)
+            pipe.execute()
+
+    def load(self, client, direction: str) -> dict[int, float]:
+        owner_field, member_field = self.directions[direction]
+        scores = {
+            pk: created_at.timestamp()
+            for pk, created_at in Follow.objects.filter(
+                **{owner_field: self.user}
+            ).values_list(member_field, "created_at")
+        }
+        key = self.get_key(direction, self.user.pk)  # type:ignore
+        pipe = client.pipeline()
+        pipe.zadd(key, {self.loaded_member: 0, **scores})
+        pipe.expire(key, settings.SOCIAL_GRAPH_CACHE_TIMEOUT)
+        pipe.execute()
+        return scores
+
+    def get_relations(self, user_ids: Iterable[int]):
+        # {유저 id: (요청유저가 팔로우한 시각, 요청유저를 팔로우한 시각)}
+        user_ids = list(set(user_ids))
+        relations: dict[int, tuple[datetime | None, datetime | None]] = {
+            pk: (None, None) for pk in user_ids
+        }
+        if not self.user or not user_ids:
+            return relations
+
+        members = [self.loaded_member, *user_ids]
+        with get_redis() as client:
+            pipe = client.pipeline()
+            for direction in self.directions:
+                pipe.zmscore(self.get_key(direction, self.user.pk), members)
+            results: list[list[float | None]] = pipe.execute()
+            for i, direction in enumerate(self.directions):
+                if results[i][0] != None:
+                    continue
+                scores = self.load(client, direction)
+                results[i] = [None, *(scores.get(pk, None) for pk in user_ids)]
+
+        to_datetime = lambda score: (
+            None if score == None else datetime.fromtimestamp(score, tz=timezone.utc)
+        )
+        followings, followers = (result[1:] for result in results)
+        for pk, following_at, followed_by_at in zip(user_ids, followings, followers):
+            relations[pk] = (to_datetime(following_at), to_datetime(followed_by_at))
+        return relations
+
+    def apply(
+        self,
+        users: Iterable[User],
+        relations: dict[int, tuple[datetime | None, datetime | None]],
+    ):
+        for user in users:
+            following_at, followed_by_at = relations.get(user.pk, (None, None))
+            user.following_at = following_at
+            user.followed_by_at = followed_by_at
+            user.is_following_to = following_at != None
+            user.is_followed_by = followed_by_at != None
+            user.is_mutual_follow = following_at != None and followed_by_at != None
+            user.relations_loaded = True
+        return users
+
+    def hydrate(self, users: Iterable[User]):
+        # User.concrete_queryset(projection="card")로 불러온 유저들에 관계값을 채워넣음
+        # 이미 채워진 유저는 건너뛰고, 채울 유저가 없으면 Redis를 조회하지 않음
+        users = [user for user in users if user and not user.relations_loaded]
+        if not users:
+            return users
+        return self.apply(users, self.get_relations(user.pk for user in users))
+
+
+class ProtectedMutualIndex:
+    """
+    유저별로 서로 팔로우중인 보호계정 id를 Redis set으로 유지
+    보호계정의 게시글은 본인과 서로 팔로우중인 유저에게만 보이므로
+    게시글 목록의 노출 조건이 작성자가 보호계정이 아니거나, 본인이거나, 이 set에 속하는지로 줄어듦
+    1. 처음 조회될 때 Follow에서 계산해 채우고, 채워졌다는 표시로 loaded_member를 함께 넣음
+    2. 팔로우/언팔로우시 두 유저의 set을, 보호계정 설정이 바뀌면 서로 팔로우중인 유저들의 set을 갱신
+    """
+
+    loaded_member = 0
+
+    @classmethod
+    def get_key(cls, user_id: int):
+        return f"social_graph/protected_mutuals:{user_id}"
+
+    @classmethod
+    def get_mutual_ids(cls, user_id: int):
+        followers = Follow.objects.filter(following_to_id=user_id).values("followed_by")
+        return Follow.objects.filter(
+            followed_by_id=user_id, following_to__in=followers
+        ).values_list("following_to", flat=True)
+
+    @classmethod
+    def get(cls, user_id: int) -> set[int]:
+        key = cls.get_key(user_id)
+        with get_redis() as client:
+            members = {int(member) for member in client.smembers(key)}
+            if cls.loaded_member in members:
+                members.discard(cls.loaded_member)
+                return members
+            members = set(
+                cls.get_mutual_ids(user_id).filter(following_to__is_protected=True)
+            )
+            pipe = client.pipeline()
+            pipe.sadd(key, cls.loaded_member, *members)
+            pipe.expire(key, settings.SOCIAL_GRAPH_CACHE_TIMEOUT)
+            pipe.execute()
+        return members
+
+    @classmethod
+    def update(cls, user_id: int, other_ids: Iterable[int]):
+        # 유저와 상대방들 사이의 팔로우가 바뀌면 서로의 set에서 상대방을 추가하거나 제거
+        other_ids = set(other_ids)
+        if not other_ids:
+            return
+        mutual_ids = set(cls.get_mutual_ids(user_id).filter(following_to__in=other_ids))
+        protected = dict(
+            User.objects.filter(pk__in=[user_id, *other_ids]).values_list(
+                "pk", "is_protected"
+            )
+        )
+        with get_redis() as client:
+            pipe = client.pipeline()
+            for other_id in other_ids:
+                pairs = ((user_id, other_id), (other_id, user_id))
+                for owner_id, member_id in pairs:
+                    if other_id in mutual_ids and protected.get(member_id, False):
+                        pipe.sadd(cls.get_key(owner_id), member_id)
+                    else:
+                        pipe.srem(cls.get_key(owner_id), member_id)
+            pipe.execute()
+
+    @classmethod
+    def update_protected(cls, user: User):
+        # 보호계정 설정이 바뀐 유저를 서로 팔로우중인 유저들의 set에 반영
+        mutual_ids = list(cls.get_mutual_ids(user.pk))
+        if not mutual_ids:
+            return
+        with get_redis() as client:
+            pipe = client.pipeline()
+            for owner_id in mutual_ids:
+                if user.is_protected:
+                    pipe.sadd(cls.get_key(owner_id), user.pk)
+                else:
+                    pipe.srem(cls.get_key(owner_id), user.pk)
+            pipe.execute()
+
+
+class FollowRecommendService:
+    """
+    친구의 친구(2-hop) 팔로우 후보를 미리 계산해두고 kNN 추천과 섞어 반환
+    1. refresh는 Follow에서 (유저, 후보)별 함께 아는 팔로잉 수를 유저 묶음 단위로 한번에 집계
+    2. 이미 팔로우중인 유저와 자기 자신은 제외하고, 유저마다 상위 FOLLOW_RECOMMEND_SIZE개를 Redis sorted set에 저장
+    3. get_scores는 저장된 후보와 kNN 결과를 합친 점수를 반환, 조회시에는 집계하지 않음
+    """
+
+    # 후보와 함께 아는 팔로잉을 거쳐 거슬러 올라간 추천받을 유저
+    source = "followed_by__followers__followed_by"
+
+    def __init__(self, user: User):
+        self.user = user
+
+    @classmethod
+    def get_key(cls, user_id: int):
+        return f"recommended_users/graph:{user_id}"
+
+    @classmethod
+    def get_candidates(cls, user_ids: Iterable[int], size: int | None = None):
+        # {유저 id: {후보 id: 함께 아는 팔로잉 수}}, 함께 아는 수가 많은 순서
+        if size == None:
+            size = settings.FOLLOW_RECOMMEND_SIZE
+        user_ids = list(user_ids)
+        # 여러 값을 갖는 관계이므로 한번만 join 되도록 먼저 annotate 한 뒤 사용
+        already = Follow.objects.filter(
+            followed_by=models.OuterRef("source_id"),
+            following_to=models.OuterRef("following_to"),
+        )
+        rows = (
+            Follow.objects.annotate(source_id=models.F(cls.source))
+            .filter(source_id__in=user_ids)
+            .exclude(following_to=models.F("source_id"))
+            .exclude(models.Exists(already))
+            .values("source_id", "following_to")
+            .annotate(mutual=models.Count("followed_by"))
+            .annotate(
+                rank=models.Window(
+                    expression=models.functions.RowNumber(),
+                    partition_by=[models.F("source_id")],
+                    order_by=[models.F("mutual").desc(), models.F("following_to")],
+                )
+            )
+            .filter(rank__lte=size)
+            .values_list("source_id", "following_to", "mutual")
+        )
+        candidates: dict[int, dict[int, int]] = {user_id: {} for user_id in user_ids}
+        for user_id, candidate_id, mutual in rows:
+            candidates[user_id][candidate_id] = mutual
+        return candidates
+
+    @classmethod
+    def refresh(cls, user_ids: Iterable[int]):
+        candidates = cls.get_candidates(user_ids)
+        with get_redis() as client:
+            pipe = client.pipeline()
+            for user_id, mutuals in candidates.items():
+                key = cls.get_key(user_id)
+                pipe.delete(key)
+                if mutuals:
+                    pipe.zadd(key, mutuals)  # type:ignore
+                    pipe.expire(key, settings.FOLLOW_RECOMMEND_TIMEOUT)
+            pipe.execute()
+        return candidates
+
+    @classmethod
+    def refresh_all(cls, batch_size: int = 500):
+        # 팔로잉이 있는 유저들을 batch_size명씩 나눠 갱신, 팔로잉이 없으면 후보도 없음
+        user_ids = (
+            Follow.objects.order_by("followed_by")
+            .values_list("followed_by", flat=True)
+            .distinct()
+        )
+        batch: list[int] = []
+        for user_id in user_ids.iterator():
+            batch.append(user_id)
+            if batch_size <= len(batch):
+                cls.refresh(batch)
+                batch = []
+        if batch:
+            cls.refresh(batch)
+
+    def get_mutuals(self) -> dict[int, float]:
+        with get_redis() as client:
+            members = client.zrevrange(
+                self.get_key(self.user.pk), 0, -1, withscores=True
+            )
+        return {int(member): score for member, score in members}  # type:ignore
+
+    def get_scores(self, knn_ids: Iterable[int] = ()) -> dict[int, float]:
+        # 함께 아는 팔로잉 수에 kNN 순위가 높을수록 최대 FOLLOW_RECOMMEND_KNN_WEIGHT까지 더함
+        scores = self.get_mutuals()
+        knn_ids = list(knn_ids)
+        weight = settings.FOLLOW_RECOMMEND_KNN_WEIGHT
+        for rank, user_id in enumerate(knn_ids):
+            knn_score = weight * (len(knn_ids) - rank) / len(knn_ids)
+            scores[user_id] = scores.get(user_id, 0) + knn_score
+        scores.pop(self.user.pk, None)
+        return scores
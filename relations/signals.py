@@ -1,31 +1,166 @@
-from django.db.models.signals import post_save, m2m_changed
+from datetime import datetime
+from functools import partial
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, m2m_changed
 from django.dispatch import receiver
 
+from users.models import UserCounter
 from .models import Follow, User
+from .service import SocialGraphCache, ProtectedMutualIndex
+
+
+def get_added_follows(instance: User, **kwargs):
+    # m2m_changed(post_add)로 새로 추가된 Follow들, reverse면 instance가 팔로우 당한 유저
+    pk_set: set[int] = kwargs.get("pk_set") or set()
+    if kwargs.get("reverse"):
+        return Follow.objects.filter(followed_by__in=pk_set, following_to=instance)
+    return Follow.objects.filter(followed_by=instance, following_to__in=pk_set)
 
 
 @receiver(m2m_changed, sender=Follow)
 def on_following_created(sender, instance: User, **kwargs):
     from notifications.models import Notification
+    from notifications.signals import send_notifications
 
-    pk_set: set[int] = kwargs.get("pk_set", set())
-    action: str = kwargs.get("action", "")
-    if action != "post_add":
+    if kwargs.get("action") != "post_add":
+        return
+    notifications = Notification.objects.bulk_create(
+        [
+            Notification(
+                user_id=follow.following_to_id,
+                from_user_id=follow.followed_by_id,
+                followed_user=follow,
+            )
+            for follow in get_added_follows(instance, **kwargs)
+            if follow.followed_by_id != follow.following_to_id
+        ]
+    )
+    send_notifications(notifications)
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created_notified(sender, instance: Follow, created: bool, **kwargs):
+    # FollowService.follow은 Follow를 직접 만들어 m2m_changed 대신 post_save만 보냄
+    from notifications.models import Notification
+
+    if not created or instance.followed_by_id == instance.following_to_id:
+        return
+    notification = Notification()
+    notification.user_id = instance.following_to_id
+    notification.from_user_id = instance.followed_by_id
+    notification.followed_user = instance
+    notification.save()
+
+
+@receiver(m2m_changed, sender=Follow)
+def on_following_added_counted(sender, instance: User, **kwargs):
+    # followings.add()는 Follow의 post_save를 보내지 않으므로 m2m_changed에서 집계
+    if kwargs.get("action") != "post_add":
+        return
+    pk_set: set[int] = kwargs.get("pk_set") or set()
+    if not kwargs.get("reverse"):
+        UserCounter.increase_follow(instance.pk, pk_set, 1)
         return
-    followed_by = instance
     for pk in pk_set:
-        following_user = User.objects.get(pk=pk)
-        follow = Follow.objects.filter(
-            followed_by=followed_by, following_to=following_user
-        ).first()
-        if not follow:
-            continue
-
-        notification = Notification()
-        notification.user = following_user
-        notification.from_user = followed_by
-        notification.followed_user = follow
-        notification.save()
+        UserCounter.increase_follow(pk, [instance.pk], 1)
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created_counted(sender, instance: Follow, created: bool, **kwargs):
+    if not created:
+        return
+    UserCounter.increase_follow(instance.followed_by_id, [instance.following_to_id], 1)
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted_counted(sender, instance: Follow, **kwargs):
+    UserCounter.increase_follow(instance.followed_by_id, [instance.following_to_id], -1)
+
+
+# Redis의 캐시/인덱스는 롤백되지 않으므로 팔로우가 커밋된 다음에 반영
+
+
+@receiver(m2m_changed, sender=Follow)
+def on_following_added_cached(sender, instance: User, **kwargs):
+    if kwargs.get("action") != "post_add":
+        return
+    following_at: dict[int, dict[int, datetime]] = {}
+    for follow in get_added_follows(instance, **kwargs):
+        following_at.setdefault(follow.followed_by_id, {})[
+            follow.following_to_id
+        ] = follow.created_at
+    for followed_by_id, following_at_by_user in following_at.items():
+        transaction.on_commit(
+            partial(SocialGraphCache.add, followed_by_id, following_at_by_user)
+        )
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created_cached(sender, instance: Follow, created: bool, **kwargs):
+    if not created:
+        return
+    transaction.on_commit(
+        partial(
+            SocialGraphCache.add,
+            instance.followed_by_id,
+            {instance.following_to_id: instance.created_at},
+        )
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted_cached(sender, instance: Follow, **kwargs):
+    transaction.on_commit(
+        partial(
+            SocialGraphCache.remove,
+            instance.followed_by_id,
+            [instance.following_to_id],
+        )
+    )
+
+
+@receiver(m2m_changed, sender=Follow)
+def on_following_added_indexed(sender, instance: User, **kwargs):
+    if kwargs.get("action") != "post_add":
+        return
+    pk_set = set(kwargs.get("pk_set") or set())
+    transaction.on_commit(partial(ProtectedMutualIndex.update, instance.pk, pk_set))
+
+
+@receiver(post_save, sender=Follow)
+def on_follow_created_indexed(sender, instance: Follow, created: bool, **kwargs):
+    if not created:
+        return
+    transaction.on_commit(
+        partial(
+            ProtectedMutualIndex.update,
+            instance.followed_by_id,
+            [instance.following_to_id],
+        )
+    )
+
+
+@receiver(post_delete, sender=Follow)
+def on_follow_deleted_indexed(sender, instance: Follow, **kwargs):
+    transaction.on_commit(
+        partial(
+            ProtectedMutualIndex.update,
+            instance.followed_by_id,
+            [instance.following_to_id],
+        )
+    )
+
+
+@receiver(post_save, sender=User)
+def on_user_protected_changed(sender, instance: User, created: bool, **kwargs):
+    update_fields = kwargs.get("update_fields", None)
+    if created or (update_fields != None and "is_protected" not in update_fields):
+        return
+    if instance.saved_is_protected == instance.is_protected:
+        return
+    instance.saved_is_protected = instance.is_protected
+    transaction.on_commit(partial(ProtectedMutualIndex.update_protected, instance))
 
 
 # @receiver(post_save, sender=Follow)
@@ -0,0 +1,8 @@
+from commons.celery import shared_task
+
+
+@shared_task()
+def refresh_recommended_users():
+    from .service import FollowRecommendService
+
+    FollowRecommendService.refresh_all()
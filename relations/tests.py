@@ -1,9 +1,12 @@
 import time
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.migrations.executor import MigrationExecutor
 from base.test import TestCase
 
 from users.models import User, models
 
-from .service import FollowService
+from .service import FollowRecommendService, FollowService, SocialGraphCache
 from .models import Follow
 
 """
@@ -119,3 +122,233 @@ class TestRelation(TestCase):
         resp = self.client.get(f"/relations/{self.user2.username}/")
         self.assertEqual(resp.status_code, 200)
         print(resp.json())
+
+    def test_user_counter(self):
+        from users.models import UserCounter
+
+        def counts(user: User):
+            user = User.concrete_queryset().get(pk=user.pk)
+            return user.followers_count, user.followings_count
+
+        s1, s2 = FollowService(self.user), FollowService(self.user2)
+        s1.follow(self.user3)
+        s2.follow(self.user3)
+        s1.follow(self.user2)
+        self.assertEqual(counts(self.user3), (2, 0))
+        self.assertEqual(counts(self.user), (0, 2))
+
+        s1.unfollow(self.user3)
+        self.assertEqual(counts(self.user3), (1, 0))
+        self.assertEqual(counts(self.user), (0, 1))
+
+        UserCounter.objects.filter(user=self.user3).update(followers_count=10)
+        UserCounter.reconcile()
+        self.assertEqual(counts(self.user3), (1, 0))
+
+    def test_social_graph_cache(self):
+        FollowService(self.user).follow(self.user2)
+        FollowService(self.user3).follow(self.user)
+        graph = SocialGraphCache(self.user)
+
+        relations = graph.get_relations([self.user2.pk, self.user3.pk])
+        follow = Follow.objects.get(followed_by=self.user, following_to=self.user2)
+        self.assertEqual(relations[self.user2.pk], (follow.created_at, None))
+        self.assertEqual(relations[self.user3.pk][0], None)
+        self.assertNotEqual(relations[self.user3.pk][1], None)
+
+        # 채워진 뒤에는 Follow를 조회하지 않고 커밋 이후 시그널로 갱신된 값을 사용
+        with self.captureOnCommitCallbacks(execute=True):
+            FollowService(self.user).follow(self.user3)
+            FollowService(self.user).unfollow(self.user2)
+        users = list(
+            User.concrete_queryset(self.user, projection="card")
+            .filter(pk__in=[self.user2.pk, self.user3.pk])
+            .order_by("pk")
+        )
+        with self.assertNumQueries(0):
+            graph.hydrate(users)
+        self.assertEqual([user.is_following_to for user in users], [False, True])
+        self.assertEqual([user.is_mutual_follow for user in users], [False, True])
+
+        # 롤백된 팔로우는 캐시에 남지 않음
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                FollowService(self.user).follow(self.user2)
+                transaction.set_rollback(True)
+        self.assertEqual(callbacks, [])
+        self.assertEqual(graph.get_relations([self.user2.pk])[self.user2.pk][0], None)
+
+    def test_follow_many(self):
+        from notifications.models import Notification
+
+        self.client.login(self.user)
+        user_ids = [self.user2.pk, self.user3.pk, self.user.pk, 0]
+        resp = self.client.post("/relations/follow/bulk/", dict(user_ids=user_ids))
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.json()["user_ids"], [self.user2.pk, self.user3.pk])
+        resp = self.client.post("/relations/follow/bulk/", dict(user_ids=user_ids))
+        self.assertEqual(resp.json()["user_ids"], [])
+
+        resp = self.client.get("/relations/follow/bulk/")
+        self.assertEqual(resp.json()["user_ids"], [self.user2.pk, self.user3.pk])
+        user = User.concrete_queryset().get(pk=self.user.pk)
+        self.assertEqual(user.followings_count, 2)
+        self.assertEqual(Notification.objects.filter(from_user=self.user).count(), 2)
+        following_at, _ = SocialGraphCache(self.user).get_relations([self.user3.pk])[
+            self.user3.pk
+        ]
+        self.assertNotEqual(following_at, None)
+
+    def test_follow_many_skips_existing(self):
+        from notifications.models import Notification
+
+        service = FollowService(self.user)
+        insert = service.insert
+
+        def insert_after_other_request(user_ids: list[int]):
+            # 중복 확인 이후 다른 요청이 먼저 user3를 팔로우함
+            Follow.objects.bulk_create(
+                [Follow(followed_by=self.user, following_to=self.user3)]
+            )
+            return insert(user_ids)
+
+        service.insert = insert_after_other_request
+        with self.captureOnCommitCallbacks(execute=True):
+            user_ids = service.follow_many([self.user2.pk, self.user3.pk])
+        self.assertEqual(user_ids, [self.user2.pk])
+        self.assertEqual(Follow.objects.filter(followed_by=self.user).count(), 2)
+        user = User.concrete_queryset().get(pk=self.user.pk)
+        self.assertEqual(user.followings_count, 1)
+        self.assertEqual(
+            list(
+                Notification.objects.filter(from_user=self.user).values_list(
+                    "user", flat=True
+                )
+            ),
+            [self.user2.pk],
+        )
+
+    def test_follow_returns_changed(self):
+        service = FollowService(self.user)
+        self.assertEqual(service.follow(self.user2), True)
+        self.assertEqual(service.follow(self.user2), False)
+        self.assertEqual(Follow.objects.filter(followed_by=self.user).count(), 1)
+        self.assertEqual(service.unfollow(self.user2), True)
+        self.assertEqual(service.unfollow(self.user2), False)
+
+        self.client.login(self.user)
+        resp = self.client.post(f"/relations/{self.user3.pk}/follow/")
+        self.assertEqual(resp.json()["is_changed"], True)
+        resp = self.client.post(f"/relations/{self.user3.pk}/follow/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()["is_changed"], False)
+
+    def test_follow_recommend(self):
+        user4, user5 = User.objects.bulk_create(
+            [
+                User(username="test4", email="test4@gmail.com", nickname="test4"),
+                User(username="test5", email="test5@gmail.com", nickname="test5"),
+            ]
+        )
+        FollowService(self.user).follow_many([self.user2.pk, self.user3.pk])
+        FollowService(self.user2).follow_many([self.user.pk, self.user3.pk, user4.pk])
+        FollowService(self.user3).follow_many([user4.pk, user5.pk])
+
+        # 이미 팔로우중인 user3와 자기 자신은 제외, user4는 user2와 user3를 통해 2명
+        candidates = FollowRecommendService.get_candidates([self.user.pk])
+        self.assertEqual(candidates[self.user.pk], {user4.pk: 2, user5.pk: 1})
+        candidates = FollowRecommendService.get_candidates([self.user.pk], size=1)
+        self.assertEqual(candidates[self.user.pk], {user4.pk: 2})
+
+        FollowRecommendService.refresh_all()
+        service = FollowRecommendService(self.user)
+        self.assertEqual(service.get_mutuals(), {user4.pk: 2, user5.pk: 1})
+        # kNN 1순위는 FOLLOW_RECOMMEND_KNN_WEIGHT(2)점, 2순위는 1점이 더해짐
+        scores = service.get_scores([user5.pk, self.user.pk])
+        self.assertEqual(scores, {user5.pk: 3, user4.pk: 2})
+
+        # 이미 팔로우중인 user2는 빠지고 점수 순서로 페이지만큼씩 조회
+        cache.set(f"recommended:users:{self.user.pk}", [user5.pk, self.user2.pk])
+        self.client.login(self.user)
+        resp = self.client.get("/relations/users/recommended/", dict(page_size=1))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual([u["id"] for u in resp.json()["results"]], [user5.pk])
+        resp = self.client.get(
+            "/relations/users/recommended/",
+            dict(page_size=1, offset=resp.json()["next_offset"]),
+        )
+        self.assertEqual([u["id"] for u in resp.json()["results"]], [user4.pk])
+        self.assertEqual(resp.json()["next_offset"], None)
+
+        FollowRecommendService.refresh([user5.pk])
+        self.assertEqual(FollowRecommendService(user5).get_mutuals(), {})
+
+
+class TestUniqueFollowMigration(TestCase):
+    migrate_from = [
+        ("relations", "0002_follow_relations_f_followi_fbec60_idx_and_more")
+    ]
+    migrate_to = [("relations", "0003_unique_follow")]
+
+    def flush_deferred_constraints(self):
+        # 이전 트랜잭션에서 저장된 데이터처럼, 지연된 FK 검사를 미리 실행
+        with connection.cursor() as cursor:
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute("SET CONSTRAINTS ALL DEFERRED")
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.loader.build_graph()
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def test_remove_duplicated_follows(self):
+        from notifications.models import Notification
+        from users.models import UserCounter
+
+        self.flush_deferred_constraints()
+        apps = self.migrate(self.migrate_from)
+        Follow = apps.get_model("relations", "Follow")
+        follows = Follow.objects.bulk_create(
+            [
+                Follow(followed_by_id=self.user.pk, following_to_id=self.user2.pk)
+                for _ in range(3)
+            ]
+        )
+        # 팔로우마다 알림이 만들어졌던 경우
+        Notification.objects.bulk_create(
+            [
+                Notification(
+                    user_id=self.user2.pk,
+                    from_user_id=self.user.pk,
+                    followed_user_id=follow.pk,
+                )
+                for follow in follows
+            ]
+        )
+        UserCounter.objects.bulk_create(
+            [
+                UserCounter(user=self.user, followings_count=3),
+                UserCounter(user=self.user2, followers_count=3),
+            ]
+        )
+        self.flush_deferred_constraints()
+
+        self.migrate(self.migrate_to)
+        self.assertEqual(
+            list(Follow.objects.values_list("pk", flat=True)), [follows[0].pk]
+        )
+        self.assertEqual(UserCounter.objects.get(user=self.user).followings_count, 1)
+        self.assertEqual(UserCounter.objects.get(user=self.user2).followers_count, 1)
+        self.assertEqual(
+            list(
+                Notification.objects.filter(followed_user__isnull=False).values_list(
+                    "followed_user_id", flat=True
+                )
+            ),
+            [follows[0].pk],
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(
+                followed_by_id=self.user.pk, following_to_id=self.user2.pk
+            )
@@ -1,4 +1,4 @@
-from rest_framework import exceptions
+from rest_framework import exceptions, serializers
 
 from django.core.cache import cache
 
@@ -8,7 +8,13 @@ from commons.viewsets.base_viewsets import BaseViewset
 from posts.services.recommend_service import RecommendService
 from posts.models import Post
 from users.serializers import UserSerializer
-from .service import FollowService, Follow, User, models
+from .service import FollowRecommendService, FollowService, Follow, User, models
+
+
+class FollowManySerializer(serializers.Serializer):
+    user_ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=100
+    )
 
 
 class FollowViewset(BaseViewset[User, User]):
@@ -23,18 +29,23 @@ class FollowViewset(BaseViewset[User, User]):
 
     @action(methods=["GET"], detail=False, url_path="users/recommended")
     def get_recommended_users(self, *args, **kwargs):
-
+        # 미리 계산된 친구의 친구 후보와 kNN 결과를 섞은 점수 순서
         user = self.request.user
         cache_key = f"recommended:users:{user.pk}"
-        if not (knn_qs := cache.get(cache_key)):
+        if (knn_ids := cache.get(cache_key)) == None:
             posts = RecommendService.get_users_related_posts(self.request.user)
             knn_qs = RecommendService.get_user_knn(posts)
-            cache.set(cache_key, knn_qs, timeout=60)
-        self.get_queryset = (
-            lambda: User.concrete_queryset(self.request.user, replace=knn_qs)
-            .filter(is_following_to=False)
-            .exclude(user=user)
-        )
+            knn_ids = list(knn_qs.values_list("pk", flat=True)[:100])
+            cache.set(cache_key, knn_ids, timeout=60)
+        scores = FollowRecommendService(user).get_scores(knn_ids)
+        followings = Follow.objects.filter(
+            followed_by=user, following_to__in=scores.keys()
+        ).values_list("following_to", flat=True)
+        for pk in followings:
+            scores.pop(pk, None)
+        # 점수 순서의 id 목록에서 페이지에 해당하는 유저만 조회
+        self.pagination_class = paginations.SessionPagination
+        self.session = sorted(scores, key=lambda pk: (scores[pk], pk), reverse=True)
         return self.list(*args, **kwargs)
 
     @action(methods=["GET"], detail=False, url_path="followings")
@@ -80,8 +91,11 @@ class FollowViewset(BaseViewset[User, User]):
     @action(methods=["POST"], detail=True, url_path="follow")
     def follow(self, *args, **kwargs):
         service = FollowService(self.request.user)
-        service.follow(self.get_object())
-        return self.result_response(True)
+        is_changed = service.follow(self.get_object())
+        return self.Response(
+            dict(is_success=True, is_changed=is_changed),
+            status=201 if is_changed else 200,
+        )
 
     @follow.mapping.delete
     def unfollow(self, *args, **kwargs):
@@ -89,6 +103,19 @@ class FollowViewset(BaseViewset[User, User]):
         service.unfollow(self.get_object())
         return self.result_response(True, 204)
 
+    @action(methods=["POST"], detail=False, url_path="follow/bulk")
+    def follow_many(self, *args, **kwargs):
+        s = FollowManySerializer(data=self.request.data)
+        s.is_valid(raise_exception=True)
+        service = FollowService(self.request.user)
+        user_ids = service.follow_many(s.validated_data["user_ids"])  # type:ignore
+        return self.Response(dict(user_ids=user_ids), status=201)
+
+    @follow_many.mapping.get
+    def get_following_ids(self, *args, **kwargs):
+        service = FollowService(self.request.user)
+        return self.Response(dict(user_ids=service.get_following_ids()))
+
     def create(self, request, *args, **kwargs):
         raise exceptions.NotFound
 
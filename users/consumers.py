@@ -3,12 +3,14 @@ from typing import Any
 from asgiref.sync import async_to_sync, sync_to_async
 
 
+from channels.db import database_sync_to_async
 from channels.layers import get_channel_layer
 from channels.generic.websocket import AsyncJsonWebsocketConsumer
 
 
 class UserConsumer(AsyncJsonWebsocketConsumer):
     signed = False
+    user: Any = None
 
     @staticmethod
     def get_group_name(user_id: int | str):
@@ -26,6 +28,8 @@ class UserConsumer(AsyncJsonWebsocketConsumer):
             await self.channel_layer.group_discard(self.group_name, self.channel_name)
 
     async def receive_json(self, content, **kwargs):
+        if content.get("type", None) == "message":
+            return await self.receive_message(content)
         if not (access := content.get("access", None)):
             return
         try:
@@ -37,12 +41,38 @@ class UserConsumer(AsyncJsonWebsocketConsumer):
                 user = await sync_to_async(auth.get_user)(raw_token)
             if int(self.group_id) == user.pk:
                 self.signed = True
+                self.user = user
             else:
                 await self.send(json.dumps(dict(type="authorization", result=False)))
         except:
             print("exception")
             await self.send(json.dumps(dict(type="authorization", result=False)))
 
+    async def receive_message(self, content: dict):
+        # 인증된 연결에서 바로 메세지를 저장하고 그룹의 참여자들에게 보냄
+        # {"type": "message", "group": 그룹 id, "message": 내용, "identifier": 선택}
+        if not self.signed or not content.get("message", None):
+            return
+        await database_sync_to_async(self.send_chat_message)(
+            content.get("group", None),
+            str(content["message"]),
+            content.get("identifier", None),
+        )
+
+    def send_chat_message(self, group_id: Any, message: str, identifier: str | None):
+        from chats.models import MessageGroup
+        from chats.services import MessageService
+
+        if not str(group_id).isdigit():
+            return
+        if not (
+            group := MessageGroup.objects.filter(
+                pk=group_id, attendants=self.user
+            ).first()
+        ):
+            return
+        MessageService(group).send_message(self.user, message, identifier)
+
     async def emit_event(self, event):
         if not self.signed:
             return
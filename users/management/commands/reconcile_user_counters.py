@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from ...models import User, UserCounter
+
+
+class Command(BaseCommand):
+    help = "Recompute follower/following counters from follows"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user-ids", nargs="*", type=int, default=None)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, user_ids=None, batch_size=1000, **options):
+        users = User.objects.all()
+        if user_ids:
+            users = users.filter(pk__in=user_ids)
+        fixed = UserCounter.reconcile(users, batch_size=batch_size)
+        self.stdout.write(f"{fixed} user counters reconciled")
@@ -0,0 +1,55 @@
+# Generated by Django 5.0.7 on 2026-10-18 12:13
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_counters(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    Follow = apps.get_model("relations", "Follow")
+    UserCounter = apps.get_model("users", "UserCounter")
+
+    def count_of(field: str):
+        return models.functions.Coalesce(
+            models.Subquery(
+                Follow.objects.filter(**{field: models.OuterRef("pk")})
+                .order_by(field)
+                .values(field)
+                .annotate(count=models.Count("pk"))
+                .values("count")
+            ),
+            models.Value(0),
+        )
+
+    rows = User.default_manager.annotate(
+        followers_count=count_of("following_to"),
+        followings_count=count_of("followed_by"),
+    ).values("pk", "followers_count", "followings_count")
+    UserCounter.objects.bulk_create(
+        [
+            UserCounter(user_id=row.pop("pk"), **row)
+            for row in rows.iterator(chunk_size=1000)
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0011_user_is_protected'),
+        ('relations', '0002_follow_relations_f_followi_fbec60_idx_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('followers_count', models.IntegerField(default=0)),
+                ('followings_count', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_user_counters, migrations.RunPython.noop),
+    ]
@@ -1,9 +1,9 @@
 from functools import partial, wraps
-from typing import Iterable, Self, TYPE_CHECKING
+from typing import Iterable, Literal, Self, TYPE_CHECKING
 from django.contrib.auth.models import AbstractBaseUser, UserManager, PermissionsMixin
 from django.db import models
 
-from commons.model_utils import make_property_field
+from commons.model_utils import CounterModel, make_property_field
 from images.models import Image
 
 
@@ -45,6 +45,9 @@ if TYPE_CHECKING:
     from ai.models import ChatBot
 
 
+Projection = Literal["card", "profile", "full"]
+
+
 class User(UserAbstract):
     is_protected = models.BooleanField(default=False)
     is_registered = models.BooleanField(default=False)
@@ -68,6 +71,7 @@ class User(UserAbstract):
     message_attendants: "models.Manager[MessageAttendant]"
     third_party_integrations: "models.Manager[ThirdPartyIntegration]"
     chatbots: "models.OneToOneField[ChatBot|None]"
+    counter: "UserCounter"
 
     followings_count = make_property_field(False)
     followers_count = make_property_field(False)
@@ -80,6 +84,26 @@ class User(UserAbstract):
     followed_by_at = make_property_field(None)
 
     is_chat_bot = make_property_field(False)
+    # 요청유저와의 관계값(is_following_to...)이 채워졌는지 여부
+    relations_loaded = make_property_field(False)
+    # DB에서 불러오거나 마지막으로 저장된 is_protected, 바뀌었을 때만 보호계정 인덱스를 갱신
+    saved_is_protected = make_property_field(None)
+
+    # UserSerializer가 보여주는 컬럼
+    card_fields = (
+        "id",
+        "username",
+        "nickname",
+        "bio",
+        "profile_image",
+        "header_image",
+        "is_protected",
+        "is_registered",
+        "email",
+        "is_staff",
+        "is_superuser",
+        "registered_at",
+    )
 
     @classmethod
     def get_following_model(cls) -> "Follow":
@@ -88,47 +112,53 @@ class User(UserAbstract):
         return cls.followings.through  # type:ignore
 
     @classmethod
-    def concrete_queryset(cls, user: AbstractBaseUser | None = None, *args, **kwargs):
+    def concrete_queryset(
+        cls,
+        user: AbstractBaseUser | None = None,
+        *args,
+        projection: Projection = "full",
+        **kwargs,
+    ):
+        """
+        projection
+        - card: 작성자/멘션/알림처럼 중첩되는 유저, card_fields 컬럼과 팔로워/팔로잉 수만 조회
+          요청유저와의 관계값은 목록 단위로 SocialGraphCache에서 한번에 채워넣음
+        - profile: card_fields 컬럼과 요청유저와의 관계까지 조회
+        - full: 모든 컬럼
+        """
         if user and not user.is_authenticated:
             user = None
 
-        return (
+        qs = (
             super()
             .concrete_queryset(*args, **kwargs)
             .select_related("profile_image")
             .annotate(
                 followers_count=cls.get_followers_count(),
                 followings_count=cls.get_followings_count(),
-                is_following_to=cls.get_is_following_to(user=user),
-                is_followed_by=cls.get_is_followed_by(user=user),
-                is_mutual_follow=cls.get_is_mutual_follow(),
-                following_at=cls.get_following_at(user=user),
-                followed_by_at=cls.get_followed_by_at(user=user),
                 is_chat_bot=models.Q(chatbots__isnull=False),
             )
         )
+        if projection in ("card", "profile"):
+            qs = qs.select_related("header_image").only(*cls.card_fields)
+        if projection == "card":
+            return qs
+        return qs.annotate(
+            is_following_to=cls.get_is_following_to(user=user),
+            is_followed_by=cls.get_is_followed_by(user=user),
+            is_mutual_follow=cls.get_is_mutual_follow(),
+            following_at=cls.get_following_at(user=user),
+            followed_by_at=cls.get_followed_by_at(user=user),
+            relations_loaded=models.Value(True),
+        )
 
     @classmethod
     def get_followers_count(cls):
-        Follow = cls.get_following_model()
-        return models.Subquery(
-            Follow.objects.filter(following_to=models.OuterRef("pk"))
-            .values("following_to")
-            .order_by("following_to")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
+        return UserCounter.get_count("followers_count")
 
     @classmethod
     def get_followings_count(cls):
-        Follow = cls.get_following_model()
-        return models.Subquery(
-            Follow.objects.filter(followed_by=models.OuterRef("pk"))
-            .values("followed_by")
-            .order_by("followed_by")
-            .annotate(count=models.Count("pk"))
-            .values("count")
-        )
+        return UserCounter.get_count("followings_count")
 
     @classmethod
     def get_following_at(cls, user: AbstractBaseUser | None):
@@ -189,10 +219,60 @@ class User(UserAbstract):
             is_followed_by=models.Value(True)
         )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # only()로 is_protected를 불러오지 않았다면 None으로 남아 바뀐것으로 취급
+        instance.saved_is_protected = instance.__dict__.get("is_protected", None)
+        return instance
+
     def save(self, *args, **kwargs) -> None:
         return super().save(*args, **kwargs)
 
 
+class UserCounter(CounterModel):
+    """
+    유저별 팔로워/팔로잉 수를 저장하는 테이블.
+    매 조회마다 Follow를 COUNT하는 대신 팔로우/언팔로우 시점에 값을 증감시키고,
+    어긋난 값은 reconcile_user_counters 커맨드로 바로잡는다.
+    """
+
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, related_name="counter"
+    )
+    followers_count = models.IntegerField(default=0)
+    followings_count = models.IntegerField(default=0)
+
+    owner_field = "user"
+    count_fields = ("followers_count", "followings_count")
+    # 감소만 있는 유저는 행을 새로 만들지 않음 (삭제중인 유저의 팔로우가 지워지는 경우)
+    create_on_decrease = False
+
+    @classmethod
+    def increase_follow(
+        cls, followed_by_id: int, following_to_ids: Iterable[int], delta: int
+    ):
+        # followed_by가 following_to들을 팔로우(delta=1)/언팔로우(delta=-1) 했을때의 증감
+        following_to_ids = list(following_to_ids)
+        if not following_to_ids:
+            return
+        deltas: dict[int, dict[str, int]] = {
+            user_id: dict(followers_count=delta) for user_id in following_to_ids
+        }
+        deltas.setdefault(followed_by_id, {})["followings_count"] = delta * len(
+            following_to_ids
+        )
+        cls.increase_many(deltas)
+
+    @classmethod
+    def get_count_subqueries(cls):
+        Follow = User.get_following_model()
+        return dict(
+            followers_count=cls.count_of(Follow.objects.all(), "following_to"),
+            followings_count=cls.count_of(Follow.objects.all(), "followed_by"),
+        )
+
+
 class ThirdPartyProvider(models.TextChoices):
     KAKAO = "kakao"
 
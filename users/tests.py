@@ -88,6 +88,34 @@ class TestUserView(TestCase):
         self.pprint(resp.json())
 
 
+class TestUserProjection(TestCase):
+    def test_projection(self):
+        from relations.service import FollowService, SocialGraphCache
+        from .serializers import UserSerializer
+
+        FollowService(self.user).follow(self.user2)
+        card = User.concrete_queryset(self.user, projection="card")
+        sql = str(card.query)
+        self.assertNotIn("password", sql)
+        self.assertNotIn("relations_follow", sql)
+        self.assertIn("relations_follow", str(User.concrete_queryset(self.user).query))
+
+        # 카드로 불러온 유저는 SocialGraphCache로 관계값을 채워넣고, 한번 채워지면 다시 조회하지 않음
+        user2 = card.get(pk=self.user2.pk)
+        self.assertEqual(user2.relations_loaded, False)
+        SocialGraphCache(self.user).hydrate([user2])
+        self.assertEqual(SocialGraphCache(self.user).hydrate([user2]), [])
+        # 중첩된 유저도 UserSerializer와 같은 필드를 추가 쿼리 없이 보여줌
+        with self.assertNumQueries(0):
+            data = UserSerializer(user2).data
+        self.assertEqual(data["is_following_to"], True)
+        self.assertEqual(data["followers_count"], 1)
+        self.assertEqual(data["email"], self.user2.email)
+
+        profile = User.concrete_queryset(self.user, projection="profile")
+        self.assertEqual(profile.get(pk=self.user2.pk).is_following_to, True)
+
+
 # 1. 유저가 생성되면 1시간 뒤에 유저를 삭제하는 셀러리 태스크를 생성
 class TestEmailAuthorization(TestCase):
     def setUp(self):